@@ -49,11 +49,13 @@ INSTALLED_APPS = [
     'companies',
     'translation_request',
     'payment',
+    'notifications',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,23 +87,124 @@ WSGI_APPLICATION = 'TranslationBridge.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ["PGDATABASE"],
-        'USER': os.environ["PGUSER"],
-        'PASSWORD': os.environ["PGPASSWORD"],
-        'HOST': os.environ["PGHOST"],
-        'PORT': os.environ["PGPORT"],
+# PostgreSQL connections come from a per-process psycopg_pool (main/db.py), tuned with
+# DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT / DB_POOL_MAX_IDLE / DB_POOL_MAX_LIFETIME.
+# DB_POOL=false falls back to persistent connections kept for DB_CONN_MAX_AGE seconds.
+
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", 60))
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+    'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+    #seconds a request waits for a free connection before PoolTimeout
+    'timeout': float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    'max_idle': float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+    'max_lifetime': float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+} if os.environ.get("DB_POOL", "true").lower() == "true" else None
+
+# SQLite is used in development and, with DB_ENGINE=sqlite, by single-node deployments.
+# Every connection runs the pragmas below: WAL lets readers work while one writer commits,
+# synchronous=NORMAL is durable in WAL mode except for the last commits on power loss,
+# writers take the lock up front (BEGIN IMMEDIATE) and wait up to SQLITE_BUSY_TIMEOUT
+# seconds for it instead of failing with "database is locked".
+# `python manage.py benchmark_sqlite_concurrency` compares this against the defaults.
+USE_SQLITE = DEBUG or os.environ.get("DB_ENGINE", "").lower() == "sqlite"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(float(os.environ.get("SQLITE_BUSY_TIMEOUT", 20)) * 1000),
+    'mmap_size': int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    #negative: KiB of page cache per connection
+    'cache_size': -int(os.environ.get("SQLITE_CACHE_KB", 64 * 1024)),
+    'temp_store': 'MEMORY',
+} if os.environ.get("SQLITE_TUNING", "true").lower() == "true" else {}
+
+if not USE_SQLITE:
+    if DB_POOL_OPTIONS and os.environ.get("DB_POOL_CHECK", "true").lower() == "true":
+        from psycopg_pool import ConnectionPool
+        #cheap round trip on checkout, a connection the server dropped is replaced
+        DB_POOL_OPTIONS['check'] = ConnectionPool.check_connection
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ["PGDATABASE"],
+            'USER': os.environ["PGUSER"],
+            'PASSWORD': os.environ["PGPASSWORD"],
+            'HOST': os.environ["PGHOST"],
+            'PORT': os.environ["PGPORT"],
+            #the pool owns connection lifetime, Django refuses CONN_MAX_AGE alongside it
+            'CONN_MAX_AGE': 0 if DB_POOL_OPTIONS else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pool': DB_POOL_OPTIONS} if DB_POOL_OPTIONS else {},
+        }
     }
-} if not DEBUG else {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': "; ".join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()),
+                'transaction_mode': 'IMMEDIATE' if SQLITE_PRAGMAS else None,
+                'timeout': float(os.environ.get("SQLITE_BUSY_TIMEOUT", 20)) if SQLITE_PRAGMAS else 5,
+            },
+        }
     }
-}
 
+# Read replicas (main/routers.py): reads go to a replica, writes and the requests of a browser
+# that just wrote go to the primary. PGREPLICA_HOSTS="host1,host2:5433" uses the primary's
+# credentials; on SQLite DB_SQLITE_REPLICAS="replica1.sqlite3" adds database files that
+# `python manage.py sync_sqlite_replicas` fills from db.sqlite3.
+_replicas = [name.strip() for name in os.environ.get("DB_SQLITE_REPLICAS" if USE_SQLITE else "PGREPLICA_HOSTS", "").split(",") if name.strip()]
+for _number, _replica in enumerate(_replicas, 1):
+    if USE_SQLITE:
+        _location = {'NAME': BASE_DIR / _replica}
+    else:
+        _host, _, _port = _replica.partition(":")
+        _location = {'HOST': _host, 'PORT': _port or DATABASES['default']['PORT']}
+    #tests read and write the primary's test database through every replica alias
+    DATABASES[f"replica{_number}"] = {**DATABASES['default'], **_location, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['main.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+
+
+
+# Cache
+# the "views" alias holds cached page responses (main/cache.py), LocMemCache evicts
+# least recently used entries once MAX_ENTRIES is reached. Point VIEW_CACHE_BACKEND at
+# FileBasedCache, Redis or Memcached to share it between gunicorn workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    #group version numbers shared by every worker (main/cache.py), a table in the main
+    #database unless VERSION_CACHE_BACKEND points at Redis or Memcached
+    'versions': {
+        'BACKEND': os.environ.get("VERSION_CACHE_BACKEND", 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get("VERSION_CACHE_LOCATION", 'cache_versions'),
+    },
+    #which image derivatives exist (main/images.py), shared so a worker never re-checks
+    #what another one generated; created by createcachetable like the versions table
+    'images': {
+        'BACKEND': os.environ.get("IMAGE_CACHE_BACKEND", 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get("IMAGE_CACHE_LOCATION", 'cache_images'),
+    },
+    'views': {
+        'BACKEND': os.environ.get("VIEW_CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get("VIEW_CACHE_LOCATION", 'translation-bridge-views'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get("VIEW_CACHE_MAX_ENTRIES", 1000)),
+        },
+    },
+}
 
+VIEW_CACHE_TIMEOUT = int(os.environ.get("VIEW_CACHE_TIMEOUT", 300))
+#how long a worker trusts the group versions it read before asking the shared store again
+VERSION_CHECK_SECONDS = float(os.environ.get("VERSION_CHECK_SECONDS", 2))
 
 
 # Password validation
@@ -151,10 +254,37 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# uploads are stored once per content hash under media/blobs/ (main/storage.py),
+# `python manage.py collect_media_blobs` removes the ones no row references
+STORAGES = {
+    "default": {"BACKEND": "main.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# resized copies of uploaded images (main/images.py), name -> max width in px
+IMAGE_DERIVATIVE_SIZES = {"thumb": 96, "card": 400, "full": 1200}
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get("IMAGE_DERIVATIVE_WORKERS", 2))
+
 #Email Settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+#Views queue emails in the outbox (notifications app), `python manage.py run_email_worker`
+#delivers them. For local testing point EMAIL_HOST/EMAIL_PORT at `python manage.py run_smtp_sink`
+#pooled SMTP backend keeps authenticated sessions open between batches (notifications/backends.py)
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "notifications.backends.PooledEmailBackend")
+EMAIL_POOL_SIZE = int(os.environ.get("EMAIL_POOL_SIZE", 2))
+EMAIL_POOL_IDLE_SECONDS = int(os.environ.get("EMAIL_POOL_IDLE_SECONDS", 60))
+
+#new request notifications: how many matched translators hear about a request, and how long
+#notifications are collected before they go out as one digest email (notifications/digests.py)
+NOTIFICATION_FANOUT_TOP_K = int(os.environ.get("NOTIFICATION_FANOUT_TOP_K", 20))
+NOTIFICATION_DIGEST_SECONDS = int(os.environ.get("NOTIFICATION_DIGEST_SECONDS", 15 * 60))
+#used for absolute links in emails
+SITE_URL = os.environ.get("SITE_URL", "http://127.0.0.1:8000")
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 587))
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "true").lower() == "true"
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
-EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
\ No newline at end of file
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
+
+#Translator matching (see translators/matching.py)
+TRANSLATOR_MATCH_TOP_K = int(os.environ.get("TRANSLATOR_MATCH_TOP_K", 12))
+TRANSLATOR_MATCH_WEIGHTS = {}
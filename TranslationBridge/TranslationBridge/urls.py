@@ -29,4 +29,5 @@ urlpatterns = [
     path('companies/', include('companies.urls')),
     path('translation_request/', include('translation_request.urls')),
     path('payment/', include('payment.urls')),
+    path('notifications/', include('notifications.urls')),
 ]+ static(settings.MEDIA_URL,document_root=settings.MEDIA_ROOT)
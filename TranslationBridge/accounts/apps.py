@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from main import images, storage
+        from .models import Profile
+
+        #resized WebP/JPEG copies for the {% responsive_image %} tag (main/images.py)
+        images.register(Profile, "avatar")
+
+        #file fields whose blobs are reference-counted by collect_media_blobs (main/storage.py)
+        storage.register(Profile, "avatar")
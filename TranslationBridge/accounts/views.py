@@ -8,8 +8,8 @@ from django.db import transaction
 
 #for sending email message
 from django.conf import settings
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from notifications.outbox import enqueue_email
+from notifications.rendering import render_email
 
 # Create your views here.
 
@@ -25,13 +25,9 @@ def sign_up(request:HttpRequest):
             profile=Profile(user=new_user, bio=request.POST["bio"],user_type=request.POST["user_type"], avatar=request.FILES.get("avatar", Profile.avatar.field.get_default()))
             profile.save()
 
-            #send confirmation email
-            content_html = render_to_string ("accounts/mail/configration.html")
-            send_to = new_user.email
-            email_message = EmailMessage("Message sending confirmation",  content_html, settings.EMAIL_HOST_USER, {send_to})
-            email_message.content_subtype = "html"
-
-            email_message.send()  
+            #queue confirmation email (delivered by the email worker)
+            content = render_email("accounts/mail/configration.html")
+            enqueue_email("Message sending confirmation", content.text, new_user.email, html_body=content.html, from_email=settings.EMAIL_HOST_USER, dedup_key=f"signup-confirmation:{new_user.pk}")
 
             messages.success(request, "Registered user successfuly", "alert-success")
             return redirect("accounts:sign_in")
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class CompaniesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'companies'
+
+    def ready(self):
+        from main import images, storage
+        from main.cache import invalidate_on
+        from .models import City, Company, Country, Language
+
+        #resized WebP/JPEG copies for the {% responsive_image %} tag (main/images.py)
+        images.register(Country, "flag")
+
+        #file fields whose blobs are reference-counted by collect_media_blobs (main/storage.py)
+        storage.register(Country, "flag")
+
+        #cached pages are invalidated when the models they show change
+        invalidate_on(
+            "companies",
+            Company, Language, City, Country,
+            m2m=(Company.languages.through,),
+        )
@@ -2,10 +2,12 @@ from django.shortcuts import render, redirect
 from django.http import HttpResponse, HttpRequest
 from .models import Company
 from django.contrib import messages
+from main.cache import cache_view
 
 
 # Create your views here.
 
+@cache_view("companies")
 def companies_list_view(request:HttpRequest):
 
     companies = Company.objects.all()
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import db, queryplans
+        from .models import Contact
+
+        #connection counts for connection_metrics()
+        db.track_connections()
+
+        #hot queries checked by `manage.py audit_query_plans` (main/queryplans.py)
+        queryplans.register("contact messages", lambda: Contact.objects.order_by("-created_at")[:50])
@@ -0,0 +1,217 @@
+"""
+Response cache for public pages.
+
+Whole responses are cached per (view, GET params, user type) in the
+"views" cache alias. Every cached view depends on one or more groups
+("translators", "companies"); each group has a version number that is part
+of the cache key, and model signals bump the version after commit, so a
+change to a translator makes every cached page that shows translators miss
+without having to find and delete keys.
+
+Group versions are shared by every worker process: they live in the
+"versions" cache alias (a table in the main database by default, so no
+extra service is needed; point VERSION_CACHE_BACKEND at Redis or Memcached
+to take the load off it). Each process remembers what it read for
+VERSION_CHECK_SECONDS, so a bump made by another worker is seen within
+that many seconds and a cache hit normally costs no query at all. Other
+process-wide caches (translators/reference.py, translators/matching.py)
+tag their data with the same versions.
+
+Only anonymous visitors are served from the cache: the navbar in
+main/base.html shows the signed in user's name and avatar, so those pages
+can't be shared.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.core.cache.backends.db import BaseDatabaseCache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+
+VIEW_CACHE_ALIAS = getattr(settings, "VIEW_CACHE_ALIAS", "views")
+VERSION_CACHE_ALIAS = getattr(settings, "VERSION_CACHE_ALIAS", "versions")
+KEY_PREFIX = "view-cache"
+
+
+def view_cache():
+    return caches[VIEW_CACHE_ALIAS]
+
+
+def version_cache():
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def _version_key(group):
+    return f"{KEY_PREFIX}:group:{group}"
+
+
+def _new_version():
+    #a version key lost to eviction must not restart at a number old entries were stored under
+    return time.time_ns()
+
+
+#group -> (version, monotonic time it was read), this process only
+_seen = {}
+_seen_lock = threading.Lock()
+
+
+def _remember(versions):
+    now = time.monotonic()
+    with _seen_lock:
+        _seen.update((group, (version, now)) for group, version in versions.items())
+
+
+def forget_group_versions():
+    """Drop the versions this process remembers, the next group_versions() asks the shared store."""
+    with _seen_lock:
+        _seen.clear()
+
+
+def group_versions(groups):
+    """Current version of each group, read from the shared store at most every VERSION_CHECK_SECONDS."""
+    max_age = getattr(settings, "VERSION_CHECK_SECONDS", 2)
+    now = time.monotonic()
+    versions = {}
+    for group in groups:
+        seen = _seen.get(group)
+        if seen is not None and now - seen[1] < max_age:
+            versions[group] = seen[0]
+
+    missing = [group for group in groups if group not in versions]
+    if missing:
+        cache = version_cache()
+        stored = cache.get_many([_version_key(group) for group in missing])
+        for group in missing:
+            key = _version_key(group)
+            if key not in stored:
+                #never seen, or expired / evicted: a new version makes every holder of the old one reload
+                cache.add(key, _new_version(), None)
+                stored[key] = cache.get(key)
+            versions[group] = stored[key]
+        _remember({group: versions[group] for group in missing})
+    return [versions[group] for group in groups]
+
+
+def _incr(cache, key):
+    """cache.incr(key), without losing concurrent increments on the database backend."""
+    if not isinstance(cache, BaseDatabaseCache):
+        #Redis and Memcached increment on the server, LocMem under its lock
+        return cache.incr(key)
+    #DatabaseCache.incr() is a get and a set: lock the row first so concurrent bumps queue up
+    #behind each other (SQLite has no FOR UPDATE, its BEGIN IMMEDIATE takes the write lock)
+    db = router.db_for_write(cache.cache_model_class)
+    connection = connections[db]
+    with transaction.atomic(using=db):
+        if connection.features.has_select_for_update:
+            table = connection.ops.quote_name(cache._table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT cache_key FROM {table} WHERE cache_key = %s FOR UPDATE",
+                    [cache.make_and_validate_key(key)],
+                )
+        return cache.incr(key)
+
+
+def bump(*groups):
+    """Invalidate every cached response and snapshot depending on one of `groups`, returns the new versions."""
+    cache = version_cache()
+    versions = {}
+    for group in groups:
+        key = _version_key(group)
+        try:
+            #atomic on shared backends
+            versions[group] = cache.incr(key)
+        except ValueError:
+            versions[group] = _new_version()
+            cache.set(key, versions[group], None)
+    #this process sees its own change immediately
+    _remember(versions)
+    return [versions[group] for group in groups]
+
+
+def user_type(request):
+    if not request.user.is_authenticated:
+        return "anonymous"
+    profile = getattr(request.user, "profile", None)
+    return profile.user_type if profile else "other"
+
+
+def _cache_key(request, view_name, groups):
+    params = sorted(request.GET.lists())
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    versions = ".".join(str(version) for version in group_versions(groups))
+    return f"{KEY_PREFIX}:{view_name}:{user_type(request)}:{digest}:{versions}"
+
+
+def _cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        #pending flash messages are rendered into the page
+        and not len(messages.get_messages(request))
+    )
+
+
+def cache_view(*groups, timeout=None):
+    """Cache a view's response for anonymous visitors until one of `groups` changes."""
+
+    def decorator(view):
+        view_name = f"{view.__module__}.{view.__name__}"
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            key = _cache_key(request, view_name, groups)
+            response = view_cache().get(key)
+            if response is not None:
+                response["X-View-Cache"] = "hit"
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                view_cache().set(key, response, timeout if timeout is not None else getattr(settings, "VIEW_CACHE_TIMEOUT", 300))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+#model -> groups showing its rows, for writes that send no signals (bulk_create in main/seed.py)
+_dependents = {}
+
+
+def depends_on(group, *models):
+    """Record that `group` shows rows of `models`, without connecting any signal (see groups_for())."""
+    for model in models:
+        _dependents.setdefault(model, set()).add(group)
+
+
+def groups_for(models):
+    """Every group depending on one of `models`, for code that changes them behind the signals' back."""
+    return sorted({group for model in models for group in _dependents.get(model, ())})
+
+
+def invalidate_on(group, *models, m2m=()):
+    """Bump `group` after commit whenever one of `models` (or M2M `through` tables) changes."""
+    depends_on(group, *models, *m2m)
+
+    def handler(sender, **kwargs):
+        #m2m_changed fires pre_ and post_ actions, only react once the rows changed
+        if kwargs.get("action", "post_").startswith("post_"):
+            transaction.on_commit(lambda: bump(group))
+
+    for model in models:
+        uid = f"view-cache-{group}-{model._meta.label_lower}"
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    for through in m2m:
+        m2m_changed.connect(handler, sender=through, weak=False, dispatch_uid=f"view-cache-{group}-{through._meta.label_lower}")
@@ -0,0 +1,52 @@
+"""
+Database connection reuse and metrics.
+
+On PostgreSQL every gunicorn worker keeps a psycopg_pool.ConnectionPool
+(settings.DATABASES OPTIONS["pool"], sized by the DB_POOL_* environment
+variables), so a request borrows an open connection instead of running
+the TCP + auth handshake. Without the pool (DB_POOL=false, or SQLite in
+development) connections persist for DB_CONN_MAX_AGE seconds instead.
+Both are health checked before reuse.
+
+connection_metrics() reports how often Django connected in this process
+(with a pool that is a checkout, not a new server connection) and, for
+pooled aliases, the pool's own counters (psycopg_pool get_stats():
+pool_size, pool_available, requests_waiting, connections_num, ...).
+`python manage.py benchmark_db_connections` measures the per-request cost.
+"""
+import threading
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+_lock = threading.Lock()
+_opened = {}
+
+
+def _connection_created(sender, connection, **kwargs):
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+def track_connections():
+    connection_created.connect(_connection_created, dispatch_uid="main-db-connection-metrics")
+
+
+def connections_opened(alias="default"):
+    return _opened.get(alias, 0)
+
+
+def connection_metrics():
+    """{alias: {"vendor", "connections_opened", "persistent", "pool": {...} or None}} for this process."""
+    metrics = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = getattr(connection, "_connection_pools", {}).get(alias) if connection.vendor == "postgresql" else None
+        metrics[alias] = {
+            "vendor": connection.vendor,
+            "connections_opened": connections_opened(alias),
+            "persistent": connection.settings_dict["CONN_MAX_AGE"] != 0 or pool is not None,
+            "pool": pool.get_stats() if pool is not None else None,
+        }
+    return metrics
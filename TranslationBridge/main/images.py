@@ -0,0 +1,250 @@
+"""
+Resized image derivatives for uploaded media.
+
+Every source image (Translator.image, Profile.avatar, Country.flag) gets
+WebP and JPEG (PNG when the image has transparency) copies at the widths
+in DERIVATIVE_SIZES, never upscaled. Files are named after the SHA-256 of
+the source bytes:
+
+    media/derivatives/ab/ab12...ef-400.webp
+
+so identical uploads (the default avatar, the same flag uploaded twice)
+share one set of files, and a re-upload under the same name gets new ones.
+
+Generation runs in a small thread pool (Pillow releases the GIL while
+decoding, resizing and encoding): model signals queue the new file after
+commit, and the {% responsive_image %} tag queues any image it finds
+without derivatives and falls back to the original until they exist.
+`python manage.py generate_image_derivatives` backfills everything.
+
+What exists is recorded in the "images" cache alias (a table in the main
+database by default), which every worker shares, and each process keeps
+what it read: the key includes the source's mtime and size, so an entry
+never goes stale. When the shared entry is missing, generate() names the
+files from the image header and only decodes the source if one of them
+isn't in storage yet.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .storage import BLOB_DIR
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+
+#name -> max width in px
+DERIVATIVE_SIZES = getattr(settings, "IMAGE_DERIVATIVE_SIZES", {"thumb": 96, "card": 400, "full": 1200})
+DERIVATIVE_DIR = "derivatives"
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+IMAGE_CACHE_ALIAS = getattr(settings, "IMAGE_CACHE_ALIAS", "images")
+#EXIF orientations that turn the image by 90 degrees (exif_transpose swaps width and height)
+ROTATED = frozenset({5, 6, 7, 8})
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+#model -> image field names
+_registry = {}
+#source key -> (derivative info or None while pending, monotonic time it was read), this process only
+_known = {}
+KNOWN_MAX_ENTRIES = 10000
+#how long a pending image is served as the original before asking the shared store again
+PENDING_CHECK_SECONDS = 2
+
+
+def image_cache():
+    return caches[IMAGE_CACHE_ALIAS]
+
+
+def _remember(key, info):
+    with _executor_lock:
+        if len(_known) >= KNOWN_MAX_ENTRIES:
+            _known.clear()
+        _known[key] = (info, time.monotonic())
+
+
+def _lookup(key):
+    with _executor_lock:
+        info, read = _known.get(key, (None, None))
+    if info is not None or (read is not None and time.monotonic() - read < PENDING_CHECK_SECONDS):
+        return info
+    info = image_cache().get(key)
+    _remember(key, info)
+    return info
+
+
+def forget_derivatives():
+    """Drop what this process remembers, the next lookups ask the shared store."""
+    with _executor_lock:
+        _known.clear()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 2), thread_name_prefix="image-derivatives")
+        return _executor
+
+
+def _source_key(name):
+    """Cache key for `name` that changes whenever the file on disk does, None if it's missing."""
+    try:
+        stat = os.stat(default_storage.path(name))
+    except (OSError, NotImplementedError):
+        return None
+    return f"images:derivatives:{hashlib.md5(name.encode()).hexdigest()}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _save(image, name, format, **options):
+    path = default_storage.path(name)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    #write to a temp name first so a reader never sees half a file
+    temporary = f"{path}.{threading.get_ident()}.tmp"
+    image.save(temporary, format, **options)
+    os.replace(temporary, path)
+
+
+def generate(name):
+    """
+    Create the derivatives of media file `name` (if missing) and cache
+    their URLs. Returns the derivative info, or None for a missing or
+    unreadable image.
+    """
+    key = _source_key(name)
+    if key is None:
+        return None
+
+    path = default_storage.path(name)
+    #blobs from main/storage.py are already named after their SHA-256
+    stem = os.path.splitext(os.path.basename(name))[0]
+    digest = stem if name.startswith(f"{BLOB_DIR}/") and len(stem) == 64 else content_hash(path)
+    base = f"{DERIVATIVE_DIR}/{digest[:2]}/{digest}"
+
+    try:
+        with Image.open(path) as opened:
+            #the header is enough to name the files, decode only if one is missing
+            width, height = opened.size
+            if opened.getexif().get(ExifTags.Base.Orientation) in ROTATED:
+                width, height = height, width
+            alpha = _has_alpha(opened)
+            fallback_format, fallback_ext = ("PNG", "png") if alpha else ("JPEG", "jpg")
+            files = [(size, f"{base}-{size}.webp", f"{base}-{size}.{fallback_ext}") for size in sorted({min(size, width) for size in DERIVATIVE_SIZES.values()})]
+            source = None
+            if not all(default_storage.exists(webp_name) and default_storage.exists(fallback_name) for _, webp_name, fallback_name in files):
+                #first frame of animated GIFs, camera rotation applied
+                opened.seek(0)
+                source = ImageOps.exif_transpose(opened)
+                source.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        image_cache().set(key, {}, None)
+        _remember(key, {})
+        return None
+
+    if source is not None:
+        source = source.convert("RGBA" if alpha else "RGB")
+        for size, webp_name, fallback_name in files:
+            resized = source if size == source.width else source.resize((size, round(source.height * size / source.width)), Image.LANCZOS)
+            _save(resized, webp_name, "WEBP", quality=WEBP_QUALITY, method=4)
+            if fallback_format == "JPEG":
+                _save(resized, fallback_name, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            else:
+                _save(resized, fallback_name, "PNG", optimize=True)
+
+    info = {
+        "webp": [(default_storage.url(webp_name), size) for size, webp_name, _ in files],
+        "fallback": [(default_storage.url(fallback_name), size) for size, _, fallback_name in files],
+        "width": width,
+    }
+    image_cache().set(key, info, None)
+    _remember(key, info)
+    return info
+
+
+def _run(name):
+    try:
+        generate(name)
+    finally:
+        with _executor_lock:
+            _pending.discard(name)
+
+
+def schedule(name):
+    """Queue derivative generation for `name` in the worker pool (at most once at a time)."""
+    if not name:
+        return None
+    with _executor_lock:
+        if name in _pending:
+            return None
+        _pending.add(name)
+    return _pool().submit(_run, name)
+
+
+def register(model, *fields):
+    """Generate derivatives for `fields` of `model` whenever an instance is saved with a new file."""
+    _registry[model] = fields
+    post_save.connect(_object_saved, sender=model, dispatch_uid=f"image-derivatives-{model._meta.label_lower}")
+
+
+def registered_files():
+    """Every distinct media file name stored in a registered image field."""
+    names = set()
+    for model, fields in _registry.items():
+        for field in fields:
+            names.update(model._default_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).values_list(field, flat=True).distinct())
+    return sorted(names)
+
+
+def _object_saved(sender, instance, **kwargs):
+    for field in _registry[sender]:
+        name = getattr(instance, field).name
+        if name and _source_key(name) is not None and _lookup(_source_key(name)) is None:
+            transaction.on_commit(lambda name=name: schedule(name))
+
+
+def derivatives(fieldfile):
+    """
+    Derivative info of an ImageField value: {"webp": [(url, width)], "fallback": [...], "width": n},
+    {} when there is nothing to show, or None while the derivatives are still being generated.
+    """
+    if not fieldfile or not fieldfile.name:
+        return {}
+    key = _source_key(fieldfile.name)
+    if key is None:
+        return {}
+    info = _lookup(key)
+    if info is None:
+        schedule(fieldfile.name)
+    return info
+
+
+def wait():
+    """Block until every queued generation has finished (tests and the backfill command)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import queryplans
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the registered hot queries and fail if one scans a large table without an index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=int, default=1000, help="Largest table (rows) a full scan is allowed on")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, plan, problems in queryplans.audit(options["threshold"], using=options["database"]):
+            if problems:
+                failed.append(name)
+                scans = ", ".join(f"{table} ({rows} rows)" for table, rows in problems)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: full scan of {scans}"))
+            else:
+                self.stdout.write(f"ok   {name}")
+            if options["verbosity"] >= 2:
+                self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(f"{len(failed)} hot queries scan tables above {options['threshold']} rows: {', '.join(failed)}")
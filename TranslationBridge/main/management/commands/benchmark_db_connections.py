@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+
+from main import db
+
+
+class Command(BaseCommand):
+    help = "Time requests through the WSGI handler with and without the connection pool and count the server connections they open"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--path", default="/search/?q=translator", help="An uncached page that queries the database")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        configured = dict(connection.settings_dict)
+        pool_options = configured["OPTIONS"].get("pool") or getattr(settings, "DB_POOL_OPTIONS", None) or True
+        persistent = configured["CONN_MAX_AGE"] or getattr(settings, "DB_CONN_MAX_AGE", 60)
+
+        #(label, CONN_MAX_AGE, pool options), the pool only exists on PostgreSQL
+        runs = [("per-request", 0, None), ("persistent", persistent, None)]
+        if connection.vendor == "postgresql":
+            runs.append(("pool", 0, pool_options))
+        else:
+            self.stdout.write(f"{connection.vendor} has no connection pool, comparing without it only")
+
+        try:
+            for label, max_age, pool in runs:
+                self._configure(connection, max_age, pool)
+                seconds, opened = self._run(connection, options["path"], options["requests"])
+                self.stdout.write(
+                    f"{label:<12} CONN_MAX_AGE={max_age} pool={pool is not None}: "
+                    f"{seconds / options['requests'] * 1000:.2f} ms/request, {opened / options['requests']:.2f} server connections/request"
+                )
+                if options["verbosity"] >= 2:
+                    metrics = db.connection_metrics()[connection.alias]
+                    self.stdout.write("  " + " ".join(f"{name}={value}" for name, value in metrics.items()))
+        finally:
+            self._configure(connection, configured["CONN_MAX_AGE"], configured["OPTIONS"].get("pool"))
+
+    def _configure(self, connection, max_age, pool):
+        connection.close()
+        if connection.vendor == "postgresql":
+            #a fresh pool per run, so its counters only cover that run
+            connection.close_pool()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        connection.settings_dict["OPTIONS"] = {**connection.settings_dict["OPTIONS"], "pool": pool}
+        if pool is None:
+            del connection.settings_dict["OPTIONS"]["pool"]
+
+    def _run(self, connection, path, count):
+        """(seconds, server connections opened) for `count` requests to `path`."""
+        handler = WSGIHandler()
+        environ = RequestFactory().get(path).environ
+        before = db.connections_opened(connection.alias)
+        started = time.perf_counter()
+        for _ in range(count):
+            #closing the response fires request_finished, which closes, keeps or returns the connection
+            response = handler(dict(environ), lambda status, headers: None)
+            response.close()
+        seconds = time.perf_counter() - started
+
+        pool = connection.pool if connection.vendor == "postgresql" else None
+        if pool is not None:
+            #connection_created also fires for every checkout, the pool knows what it really opened
+            return seconds, pool.get_stats().get("connections_num", 0)
+        return seconds, db.connections_opened(connection.alias) - before
@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def _connect(path, pragmas):
+    #what Django does per connection: busy timeout, then the init_command pragmas
+    connection = sqlite3.connect(path, timeout=pragmas.get("busy_timeout", 5000) / 1000, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name}={value}")
+    return connection
+
+
+def _worker(path, pragmas, seconds, write_ratio, results):
+    connection = _connect(path, pragmas)
+    begin = "BEGIN IMMEDIATE" if pragmas else "BEGIN"
+    reads = writes = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if random.random() < write_ratio:
+                #read-modify-write, like saving a form
+                connection.execute(begin)
+                total = connection.execute("SELECT COUNT(*) FROM item").fetchone()[0]
+                connection.execute("INSERT INTO item (name, total) VALUES (?, ?)", (f"item {total}", total))
+                connection.execute("COMMIT")
+                writes += 1
+            else:
+                connection.execute("SELECT name, total FROM item ORDER BY id DESC LIMIT 20").fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            locked += 1
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+    results.put((reads, writes, locked))
+
+
+class Command(BaseCommand):
+    help = "Compare SQLite read/write throughput of concurrent workers with default settings and the tuned pragmas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent processes, like gunicorn workers")
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        profiles = [("default", {}), ("tuned", settings.SQLITE_PRAGMAS)]
+        for label, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "benchmark.sqlite3")
+                setup = _connect(path, pragmas)
+                setup.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT, total INTEGER)")
+                setup.executemany("INSERT INTO item (name, total) VALUES (?, ?)", ((f"item {n}", n) for n in range(1000)))
+                setup.close()
+
+                results = multiprocessing.Queue()
+                workers = [
+                    multiprocessing.Process(target=_worker, args=(path, pragmas, options["seconds"], options["write_ratio"], results))
+                    for _ in range(options["workers"])
+                ]
+                for worker in workers:
+                    worker.start()
+                totals = [sum(column) for column in zip(*(results.get() for _ in workers))]
+                for worker in workers:
+                    worker.join()
+
+            reads, writes, locked = totals
+            self.stdout.write(
+                f"{label:<8} {reads / options['seconds']:>9.0f} reads/s {writes / options['seconds']:>7.0f} writes/s "
+                f"{locked:>6} 'database is locked' errors"
+            )
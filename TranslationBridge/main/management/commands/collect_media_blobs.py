@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main import storage
+
+
+class Command(BaseCommand):
+    help = "Delete media blobs and image derivatives that no translator, profile, country or request references"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--adopt", action="store_true", help="First move rows off files uploaded before content-addressed storage")
+        parser.add_argument("--grace-seconds", type=int, default=storage.GC_GRACE_SECONDS, help="Keep unreferenced blobs younger than this")
+        parser.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+
+    def handle(self, *args, **options):
+        if options["adopt"]:
+            self.stdout.write(f"Moved {storage.adopt()} rows onto blobs")
+
+        removed, freed = storage.collect_garbage(grace_seconds=options["grace_seconds"], dry_run=options["dry_run"])
+        for name in removed:
+            self.stdout.write(name)
+        blobs = sum(name.startswith(f"{storage.BLOB_DIR}/") for name in removed)
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {blobs} blobs and {len(removed) - blobs} image derivatives ({freed / 1024 / 1024:.1f} MB)"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import exports
+
+
+class Command(BaseCommand):
+    help = "Stream an export (invoices, requests) as CSV or NDJSON to stdout or a file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="invoices or requests")
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--status", help="Only rows with this status")
+        parser.add_argument("--from", dest="date_from", help="First day to include (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", help="Last day to include (YYYY-MM-DD)")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            lines = exports.stream(
+                options["name"],
+                options["format"],
+                status=options["status"],
+                date_from=options["date_from"],
+                date_to=options["date_to"],
+                chunk_size=options["chunk_size"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
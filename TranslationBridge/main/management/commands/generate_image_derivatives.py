@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main import images
+
+
+class Command(BaseCommand):
+    help = "Generate the resized WebP/JPEG derivatives of every uploaded image"
+
+    def handle(self, *args, **options):
+        names = images.registered_files()
+        for name in names:
+            images.schedule(name)
+        images.wait()
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(names)} images"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for every registered model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--missing", action="store_true", help="Only models that have rows but nothing indexed yet (run on every deploy)")
+
+    def handle(self, *args, **options):
+        for model in search.registered_models():
+            if options["missing"] and search.is_indexed(model):
+                self.stdout.write(f"{model._meta.verbose_name_plural} already indexed, skipped")
+                continue
+            indexed = search.rebuild(model, batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} {model._meta.verbose_name_plural}"))
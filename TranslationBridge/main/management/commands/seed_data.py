@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import seed
+
+
+class Command(BaseCommand):
+    help = "Load the initial_data fixtures with bulk upserts, skipping them when they haven't changed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixture", nargs="?", default=seed.DEFAULT_FIXTURE)
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--force", action="store_true", help="Load even when the checksum matches")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        loaded = seed.seed(options["fixture"], using=options["database"], force=options["force"])
+        elapsed = (time.perf_counter() - started) * 1000
+        if loaded is None:
+            self.stdout.write(f"{options['fixture']} unchanged, skipped ({elapsed:.0f} ms)")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Seeded {loaded} objects from {options['fixture']} ({elapsed:.0f} ms)"))
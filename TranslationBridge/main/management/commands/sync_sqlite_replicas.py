@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from main.routers import replicas
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into every SQLite replica (local stand-in for replication)"
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Only SQLite replicas can be synced locally, PostgreSQL replicas follow the primary themselves")
+
+        primary.ensure_connection()
+        for alias in replicas():
+            replica = connections[alias]
+            replica.ensure_connection()
+            #online backup API: consistent copy even while the primary is in use
+            primary.connection.backup(replica.connection)
+            self.stdout.write(self.style.SUCCESS(f"Copied {primary.settings_dict['NAME']} -> {replica.settings_dict['NAME']}"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_contact_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('checksum', models.CharField(max_length=64)),
+                ('objects_loaded', models.PositiveIntegerField(default=0)),
+                ('seeded_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
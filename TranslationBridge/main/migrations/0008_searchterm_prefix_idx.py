@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('main', '0007_seedstate'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='searchterm',
+            name='search_term_idx',
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['content_type', 'term'], name='search_term_prefix_idx', opclasses=['int4_ops', 'text_pattern_ops']),
+        ),
+    ]
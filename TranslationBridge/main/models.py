@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 
 # Create your models here.
 
@@ -8,4 +10,65 @@ class Contact(models.Model):
     last_name = models.CharField(max_length=100)
     email = models.EmailField(unique=False)
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            #contact_message_view lists the newest messages first
+            models.Index(fields=["-created_at"], name="contact_created_idx"),
+        ]
+
+
+#Full-text search inverted index (maintained by main/search.py)
+class SearchTerm(models.Model):
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["content_type", "object_id", "term"], name="search_term_unique"),
+        ]
+        indexes = [
+            #prefix lookups (term LIKE 'abc%') per model; text_pattern_ops so PostgreSQL can use the
+            #index for LIKE under any collation (ignored on SQLite)
+            models.Index(fields=["content_type", "term"], name="search_term_prefix_idx", opclasses=["int4_ops", "text_pattern_ops"]),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.content_type_id}:{self.object_id})"
+
+
+
+#Status change log written by main/statemachine.py
+class StatusTransition(models.Model):
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    source = models.CharField(max_length=50)
+    target = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["content_type", "object_id", "created_at"], name="status_transition_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_id} {self.source} -> {self.target}"
+
+
+#Fixture checksums recorded by main/seed.py
+class SeedState(models.Model):
+
+    name = models.CharField(max_length=100, unique=True)
+    checksum = models.CharField(max_length=64)
+    objects_loaded = models.PositiveIntegerField(default=0)
+    seeded_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.checksum[:12]})"
@@ -0,0 +1,171 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of `COUNT(*)` + `OFFSET`, each page remembers the sort key of its
+first and last rows in an opaque signed token and the next page is fetched
+with `WHERE (rating, id) < (last rating, last id)`, so page N costs the
+same as page 1 as long as an index covers the ordering.
+"""
+import datetime
+import hashlib
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+
+
+CURSOR_PARAM = "cursor"
+CURSOR_SALT = "main.pagination.cursor"
+
+#how long an exact fallback count is reused for
+COUNT_CACHE_SECONDS = 60
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    return str(value)
+
+
+def approximate_count(queryset):
+    """
+    Cheap row count for the "about N results" label.
+
+    On PostgreSQL an unfiltered queryset reads the planner estimate from
+    pg_class, everything else falls back to an exact count that is cached
+    for a short while per query.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+
+    sql, params = queryset.values("pk").query.sql_with_params()
+    key = "pagination:count:" + hashlib.md5(f"{queryset.db}:{sql}:{params}".encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_SECONDS)
+    return count
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, query_params, count=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_count = count
+        self._query_params = query_params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def _query(self, cursor):
+        params = self._query_params.copy()
+        params[CURSOR_PARAM] = cursor
+        return params.urlencode()
+
+    #query strings for the Previous / Next links, keeping the other GET params
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor) if self.has_next else ""
+
+    @property
+    def previous_query(self):
+        return self._query(self.previous_cursor) if self.has_previous else ""
+
+
+class KeysetPaginator:
+    """
+    Paginate `queryset` on `ordering`, e.g. ("-rating", "-id").
+
+    The ordering must end with a unique field (normally the pk) so every
+    row has a distinct position.
+    """
+
+    def __init__(self, queryset, ordering, per_page, with_count=False):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.with_count = with_count
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    def _filter(self, values, forward):
+        #(a, b) after (x, y) == a > x OR (a = x AND b > y), flipped for descending fields
+        condition = Q()
+        for position, name in enumerate(self.ordering):
+            field = self.fields[position]
+            descending = name.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            step = Q(**{f"{field}__{lookup}": values[position]})
+            for previous, value in zip(self.fields[:position], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+
+    def _cursor(self, obj, forward):
+        values = [_encode(getattr(obj, field)) for field in self.fields]
+        return signing.dumps({"v": values, "f": forward}, salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            model_fields = [self.queryset.model._meta.get_field(field) for field in self.fields]
+            values = [field.to_python(value) for field, value in zip(model_fields, data["v"])]
+            return values, bool(data["f"])
+        except (signing.BadSignature, KeyError, TypeError, ValueError, ValidationError):
+            #a broken or stale cursor just starts from the first page
+            return None, True
+
+    def get_page(self, query_params):
+        """Return the page selected by the `cursor` GET parameter."""
+        cursor = query_params.get(CURSOR_PARAM)
+        values, forward = self._decode(cursor) if cursor else (None, True)
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._filter(values, forward))
+        queryset = queryset.order_by(*(self.ordering if forward else self._reversed_ordering()))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        params = query_params.copy()
+        params.pop(CURSOR_PARAM, None)
+
+        return KeysetPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self._cursor(rows[-1], True) if rows else None,
+            previous_cursor=self._cursor(rows[0], False) if rows else None,
+            query_params=params,
+            count=approximate_count(self.queryset) if self.with_count else None,
+        )
@@ -0,0 +1,63 @@
+"""
+Query plan audit for the hot query paths.
+
+Apps register the querysets their busiest views run in AppConfig.ready():
+
+    queryplans.register("requests by type", lambda: TranslationRequest.objects.filter(request_type="hire"))
+
+`python manage.py audit_query_plans` EXPLAINs each of them on the current
+database and fails when one reads a whole table of more than --threshold
+rows: a "Seq Scan" on PostgreSQL (rows as estimated by the planner, so
+run ANALYZE on realistic data first) or a plain "SCAN <table>" without an
+index on SQLite (rows counted). Small tables are left alone, a sequential
+scan is the cheapest plan for them.
+"""
+import re
+
+from django.db import connections
+
+
+#name -> (queryset factory, vendors or None for every database)
+_registry = {}
+
+POSTGRES_SEQ_SCAN_RE = re.compile(r"Seq Scan on (\w+).*?rows=(\d+)")
+SQLITE_SCAN_RE = re.compile(r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)")
+
+
+def register(name, queryset, vendors=None):
+    _registry[name] = (queryset, vendors)
+
+
+def registered():
+    return list(_registry)
+
+
+def _sqlite_rows(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+        return cursor.fetchone()[0]
+
+
+def full_scans(queryset, using="default"):
+    """[(table, rows)] for every whole-table scan in the plan of `queryset`."""
+    connection = connections[using]
+    plan = queryset.using(using).explain()
+    if connection.vendor == "postgresql":
+        return [(table, int(rows)) for table, rows in POSTGRES_SEQ_SCAN_RE.findall(plan)]
+    if connection.vendor == "sqlite":
+        return [(table, _sqlite_rows(connection, table)) for table in SQLITE_SCAN_RE.findall(plan)]
+    return []
+
+
+def audit(threshold, using="default"):
+    """
+    Yield (name, plan, problems) for every registered query that runs on this
+    database; `problems` lists the (table, rows) scans above `threshold`.
+    """
+    vendor = connections[using].vendor
+    for name, (factory, vendors) in _registry.items():
+        if vendors and vendor not in vendors:
+            continue
+        queryset = factory()
+        scans = full_scans(queryset, using)
+        yield name, queryset.using(using).explain(), [(table, rows) for table, rows in scans if rows > threshold]
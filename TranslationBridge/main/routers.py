@@ -0,0 +1,118 @@
+"""
+Primary / replica database routing.
+
+With replicas configured (DATABASE_REPLICAS in settings, from the
+PGREPLICA_HOSTS or DB_SQLITE_REPLICAS environment variables) writes go to
+"default" and reads are spread over the replicas. Reads stay on the
+primary when:
+
+- the request has written to the primary (whatever its HTTP method: the
+  emailed "issue invoice" link and the "confirm transfer" button are
+  GETs), is a POST/PUT/PATCH/DELETE, or comes from a browser that wrote in
+  the last REPLICA_STICKY_SECONDS (read-your-writes: a user who just
+  signed in, created a request or issued an invoice sees it even if the
+  replicas lag behind);
+- a transaction is open on the primary, so select_for_update and
+  read-modify-write code in atomic() blocks read what they lock;
+- code asks for it with `with pin_to_primary(): ...`.
+
+Tables of the database cache backend (the "versions" alias of main/cache.py)
+always read from the primary, and writing to them doesn't pin the request:
+a cache fill on an anonymous GET is not a write the visitor has to read
+back, and a replica that lags behind would hand out stale group versions.
+
+Each request reads from one replica, picked when it starts, so a page
+never mixes rows from replicas at different lag.
+
+Migrations only run on the primary, replication copies them. For local
+testing with SQLite files `python manage.py sync_sqlite_replicas` copies
+the primary into every replica file.
+"""
+import contextlib
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+STICKY_COOKIE = "db_primary_until"
+UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+#app_label of django.core.cache.backends.db.DatabaseCache's model
+CACHE_APP_LABEL = "django_cache"
+
+_pinned = contextvars.ContextVar("pinned_to_primary", default=False)
+#per request: {"replica": alias, "primary": read the primary from now on, "wrote": bool}
+_request = contextvars.ContextVar("replica_request", default=None)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+@contextlib.contextmanager
+def pin_to_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        state = _request.get()
+        if state is None:
+            return random.choice(aliases)
+        return DEFAULT_DB_ALIAS if state["primary"] else state["replica"]
+
+    def db_for_write(self, model, **hints):
+        #the rest of the request (and the browser's next ones) read what was just written
+        state = _request.get()
+        if state is not None and model._meta.app_label != CACHE_APP_LABEL:
+            state["primary"] = state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        #every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Pick the request's replica, and pin it to the primary once it writes or when its browser wrote recently."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        aliases = replicas()
+        if not aliases:
+            return self.get_response(request)
+
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        unsafe = request.method in UNSAFE_METHODS
+
+        state = {"replica": random.choice(aliases), "primary": sticky or unsafe, "wrote": False}
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+
+        if state["wrote"] or unsafe:
+            seconds = getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+            response.set_cookie(STICKY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite="Lax")
+        return response
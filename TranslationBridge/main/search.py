@@ -0,0 +1,172 @@
+"""
+Full-text search over registered models.
+
+Text fields are tokenized into a SearchTerm inverted index (one row per
+object and term, weighted by field boost and term frequency). Queries
+prefix-match every word and rank objects by how many query words they
+contain, then by a tf-idf style score. The index lives in an ordinary
+table, so it behaves the same on SQLite in development and PostgreSQL in
+production.
+
+Apps register their models in AppConfig.ready():
+
+    search.register(Translator, {"name": 2.0, "experience": 1.0})
+"""
+import math
+import re
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.signals import post_save, post_delete
+
+from .models import SearchTerm
+from .pagination import approximate_count
+
+
+TOKEN_RE = re.compile(r"\w+")
+MIN_TOKEN_LENGTH = 2
+MAX_QUERY_TOKENS = 8
+
+#model -> {field name: boost}
+_registry = {}
+
+
+def tokenize(text):
+    """Split text into case-folded words, Arabic included."""
+    tokens = []
+    for token in TOKEN_RE.findall(str(text or "").casefold()):
+        if len(token) >= MIN_TOKEN_LENGTH:
+            tokens.append(token[:SearchTerm._meta.get_field("term").max_length])
+    return tokens
+
+
+def register(model, fields):
+    _registry[model] = fields
+    uid = f"search-index-{model._meta.label_lower}"
+    post_save.connect(_object_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_object_deleted, sender=model, dispatch_uid=uid)
+
+
+def registered_models():
+    return list(_registry)
+
+
+# ---------- indexing ----------
+
+def _terms(obj):
+    weights = Counter()
+    for field, boost in _registry[type(obj)].items():
+        #log-scaled term frequency, so repeating a word doesn't dominate the score
+        for term, frequency in Counter(tokenize(getattr(obj, field))).items():
+            weights[term] += boost * (1 + math.log(frequency))
+    return weights
+
+
+def index_object(obj):
+    content_type = ContentType.objects.get_for_model(obj)
+    with transaction.atomic():
+        SearchTerm.objects.filter(content_type=content_type, object_id=obj.pk).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(content_type=content_type, object_id=obj.pk, term=term, weight=weight)
+            for term, weight in _terms(obj).items()
+        )
+
+
+def remove_object(model, pk):
+    SearchTerm.objects.filter(content_type=ContentType.objects.get_for_model(model), object_id=pk).delete()
+
+
+def rebuild(model, batch_size=500):
+    """Drop and re-create the index for `model`, returns the number of indexed objects."""
+    content_type = ContentType.objects.get_for_model(model)
+    fields = ["pk", *_registry[model]]
+    indexed = 0
+    with transaction.atomic():
+        SearchTerm.objects.filter(content_type=content_type).delete()
+        batch = []
+        for obj in model.objects.only(*fields).iterator(chunk_size=batch_size):
+            batch.extend(
+                SearchTerm(content_type=content_type, object_id=obj.pk, term=term, weight=weight)
+                for term, weight in _terms(obj).items()
+            )
+            indexed += 1
+            if len(batch) >= batch_size:
+                SearchTerm.objects.bulk_create(batch)
+                batch = []
+        SearchTerm.objects.bulk_create(batch)
+    return indexed
+
+
+def is_indexed(model):
+    """True when `model` has no rows or some of them are in the index (signals keep it current from there)."""
+    if SearchTerm.objects.filter(content_type=ContentType.objects.get_for_model(model)).exists():
+        return True
+    return not model.objects.exists()
+
+
+def _object_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index_object(instance))
+
+
+def _object_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: remove_object(sender, pk))
+
+
+# ---------- querying ----------
+
+def _prefix(token):
+    #LIKE 'abc%' rather than a >= / < range: range bounds depend on the database collation
+    return Q(term__startswith=token)
+
+
+def search(model, query, limit=20):
+    """
+    Return [(pk, score), ...] for `model`, best matches first.
+
+    Every query word is treated as a prefix ("transl" finds "translator").
+    Objects containing more of the query words always rank above objects
+    containing fewer; ties are broken by the weighted idf score.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return []
+
+    matched = Q()
+    for token in tokens:
+        matched |= _prefix(token)
+    terms = SearchTerm.objects.filter(matched, content_type=ContentType.objects.get_for_model(model))
+
+    #document frequency of every query word in one query, only touching the matching index ranges
+    stats = terms.aggregate(**{f"df{i}": Count("object_id", filter=_prefix(token), distinct=True) for i, token in enumerate(tokens)})
+    documents = approximate_count(model.objects.all()) or 1
+    idf = [math.log(1 + documents / stats[f"df{i}"]) if stats[f"df{i}"] else 0 for i in range(len(tokens))]
+
+    hits = [f"hit{i}" for i in range(len(tokens))]
+    results = (
+        terms
+        .values("object_id")
+        .annotate(
+            score=Sum(Case(
+                *[When(_prefix(token), then=F("weight") * Value(idf[i])) for i, token in enumerate(tokens)],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )),
+            **{hits[i]: Max(Case(When(_prefix(token), then=Value(1)), default=Value(0), output_field=IntegerField())) for i, token in enumerate(tokens)},
+        )
+        .annotate(matched_words=sum((F(hit) for hit in hits[1:]), F(hits[0])))
+        .order_by("-matched_words", "-score", "object_id")
+        .values_list("object_id", "score")
+    )
+    return list(results[:limit])
+
+
+def search_objects(model, query, limit=20, queryset=None):
+    """Like search() but returns model instances in rank order."""
+    ranked = search(model, query, limit)
+    if queryset is None:
+        queryset = model.objects.all()
+    objects = queryset.in_bulk([pk for pk, _ in ranked])
+    return [objects[pk] for pk, _ in ranked if pk in objects]
@@ -0,0 +1,136 @@
+"""
+Idempotent fixture seeding for deploys.
+
+`python manage.py seed_data` (run by railway.json on every boot) finds the
+initial_data.json fixtures of every app, like loaddata does, and hashes
+them. When the checksum matches the SeedState row written by the last run
+it stops after one query. Otherwise every object is upserted with
+bulk_create(update_conflicts=True) per model and the M2M rows of the
+seeded objects are replaced, all in one transaction, and the checksum is
+recorded. A new, empty database has no SeedState row, so it is always
+seeded.
+
+Like loaddata this overwrites seeded rows with the fixture values and
+leaves other rows alone. bulk_create doesn't send post_save, so the
+search index of the seeded models is rebuilt afterwards, and after commit
+every cache group showing them (main/cache.py: cached pages, lookup
+tables, the matching index) is bumped.
+"""
+import hashlib
+import os
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import search
+from .cache import bump, groups_for
+from .models import SeedState
+
+
+DEFAULT_FIXTURE = "initial_data.json"
+BATCH_SIZE = 500
+#bump when the loading logic changes, so existing databases are seeded again
+SEED_FORMAT = b"seed-v1"
+
+
+def fixture_files(name=DEFAULT_FIXTURE):
+    """Paths of `name` in every app's fixtures/ directory and FIXTURE_DIRS, in INSTALLED_APPS order."""
+    directories = [os.path.join(app_config.path, "fixtures") for app_config in apps.get_app_configs()]
+    directories += [str(directory) for directory in settings.FIXTURE_DIRS]
+    return [os.path.join(directory, name) for directory in directories if os.path.isfile(os.path.join(directory, name))]
+
+
+def checksum(paths):
+    digest = hashlib.sha256(SEED_FORMAT)
+    for path in paths:
+        digest.update(os.path.relpath(path, settings.BASE_DIR).encode())
+        with open(path, "rb") as fixture:
+            digest.update(hashlib.sha256(fixture.read()).digest())
+    return digest.hexdigest()
+
+
+def _read(paths, using):
+    """({model: [instance]}, {model: {m2m field name: {pk: [target pks]}}}) in fixture order."""
+    objects = defaultdict(list)
+    m2m = defaultdict(lambda: defaultdict(dict))
+    for path in paths:
+        with open(path, encoding="utf-8") as fixture:
+            for deserialized in serializers.deserialize("json", fixture, using=using, ignorenonexistent=True):
+                model = type(deserialized.object)
+                objects[model].append(deserialized.object)
+                for field_name, targets in (deserialized.m2m_data or {}).items():
+                    m2m[model][field_name][deserialized.object.pk] = targets
+    return objects, m2m
+
+
+def _upsert(model, instances, using):
+    manager = model._base_manager.using(using)
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    #bulk_create runs pre_save, which would stamp auto_now(_add) fields with the current time
+    stamped = [field for field in fields if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)]
+    fixture_values = [[getattr(obj, field.attname) for field in stamped] for obj in instances]
+
+    if fields:
+        manager.bulk_create(
+            instances, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=[model._meta.pk.name], update_fields=[field.name for field in fields],
+        )
+    else:
+        manager.bulk_create(instances, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    if stamped:
+        for obj, values in zip(instances, fixture_values):
+            for field, value in zip(stamped, values):
+                setattr(obj, field.attname, value)
+        manager.bulk_update(instances, [field.name for field in stamped], batch_size=BATCH_SIZE)
+
+
+def _replace_m2m(model, field_name, targets, using):
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    rows = through._base_manager.using(using)
+    rows.filter(**{f"{source}__in": list(targets)}).delete()
+    rows.bulk_create(
+        (through(**{f"{source}_id": pk, f"{target}_id": target_pk}) for pk, target_pks in targets.items() for target_pk in target_pks),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def seed(name=DEFAULT_FIXTURE, using=DEFAULT_DB_ALIAS, force=False):
+    """Load fixture `name` if it changed since the last run. Returns the number of objects loaded, None if skipped."""
+    paths = fixture_files(name)
+    digest = checksum(paths)
+    if not force and SeedState.objects.using(using).filter(name=name, checksum=digest).exists():
+        return None
+
+    objects, m2m = _read(paths, using)
+    connection = connections[using]
+    with transaction.atomic(using):
+        for model, instances in objects.items():
+            _upsert(model, instances, using)
+        for model, fields in m2m.items():
+            for field_name, targets in fields.items():
+                _replace_m2m(model, field_name, targets, using)
+
+        #explicit primary keys leave PostgreSQL sequences behind, same reset loaddata does
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(objects)):
+                cursor.execute(sql)
+
+        SeedState.objects.using(using).update_or_create(name=name, defaults={"checksum": digest, "objects_loaded": sum(map(len, objects.values()))})
+
+    through = [model._meta.get_field(field_name).remote_field.through for model, fields in m2m.items() for field_name in fields]
+    groups = groups_for([*objects, *through])
+    if groups:
+        #other workers hold cached pages and snapshots of the old rows
+        transaction.on_commit(lambda: bump(*groups), using=using)
+
+    for model in search.registered_models():
+        if model in objects:
+            search.rebuild(model)
+    return sum(map(len, objects.values()))
@@ -0,0 +1,95 @@
+"""
+Status state machines.
+
+A StateMachine lists the allowed moves of a model's status field:
+
+    invoice_states = StateMachine(Invoice, {
+        "issued": {"paid", "transferred"},
+        "paid": {"transferred"},
+    })
+    invoice_states.transition(invoice, "transferred", user=request.user, transfer_confirmation_date=now)
+
+transition() checks the move against the table, then applies it with one
+conditional `UPDATE ... SET status = target WHERE pk = .. AND status =
+<status the caller saw>`: if another request moved the row in between, no
+row matches and TransitionError is raised instead of overwriting the other
+change. A move to the same status (assigned -> assigned, reassigning a
+request) can't be detected by the status alone, so it is also conditional
+on the fields it changes still holding the values the caller saw.
+
+Every successful move is recorded as a StatusTransition row and announced
+through the `transitioned` signal (the UPDATE bypasses post_save).
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import StatusTransition
+
+
+#sender=model class, kwargs: instance, source, target, previous ({field: value before the move})
+transitioned = Signal()
+
+
+class TransitionError(Exception):
+    pass
+
+
+class StateMachine:
+
+    def __init__(self, model, transitions, field="status"):
+        self.model = model
+        self.field = field
+        self.transitions = {source: frozenset(targets) for source, targets in transitions.items()}
+
+    def can(self, source, target):
+        return target in self.transitions.get(source, ())
+
+    def targets(self, source):
+        return self.transitions.get(source, frozenset())
+
+    def sources(self, target):
+        """States a row may be in to move to `target`, e.g. for "pending work" queries."""
+        return {source for source, targets in self.transitions.items() if target in targets}
+
+    def transition(self, instance, target, user=None, note="", **fields):
+        """
+        Move `instance` from its current status to `target`, also setting
+        `fields` in the same UPDATE. Raises TransitionError when the move
+        isn't allowed or the row's status changed since it was loaded.
+        """
+        source = getattr(instance, self.field)
+        if not self.can(source, target):
+            raise TransitionError(f"{self.model._meta.verbose_name} #{instance.pk} can't go from {source!r} to {target!r}.")
+
+        previous = {self.field: source, **{name: getattr(instance, name) for name in fields}}
+        conditions = {self.field: source}
+        if source == target:
+            for name in fields:
+                attname = self.model._meta.get_field(name).attname
+                conditions[attname] = getattr(instance, attname)
+        with transaction.atomic():
+            updated = self.model.objects.filter(pk=instance.pk, **conditions).update(**{self.field: target}, **fields)
+            if not updated:
+                raise TransitionError(f"{self.model._meta.verbose_name} #{instance.pk} was changed by someone else, reload and try again.")
+
+            setattr(instance, self.field, target)
+            for name, value in fields.items():
+                setattr(instance, name, value)
+
+            StatusTransition.objects.create(
+                content_type=ContentType.objects.get_for_model(self.model),
+                object_id=instance.pk,
+                source=source,
+                target=target,
+                user=user if user is not None and user.is_authenticated else None,
+                note=note,
+            )
+            transitioned.send(sender=self.model, instance=instance, source=source, target=target, previous=previous)
+        return instance
+
+    def history(self, instance):
+        return StatusTransition.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            object_id=instance.pk,
+        ).order_by("created_at", "id")
@@ -0,0 +1,174 @@
+"""
+Content-addressed media storage.
+
+Uploads are hashed (SHA-256) while they are streamed to a temporary file
+and stored once under their digest:
+
+    media/blobs/ab/ab12...ef.png
+
+Uploading the same bytes again (the default avatar, a flag picked twice,
+the same screenshot for several translators) returns the existing name
+instead of writing another copy with a random suffix. A blob can be shared
+by any number of rows, so it is never deleted when one of them changes;
+`python manage.py collect_media_blobs` counts the references held by the
+registered file fields and removes blobs nothing points at any more,
+together with the resized copies main/images.py made of them
+(media/derivatives/, named after the same SHA-256).
+
+Apps register their file fields in AppConfig.ready():
+
+    storage.register(Translator, "image")
+"""
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+
+
+BLOB_DIR = "blobs"
+#blobs younger than this are kept even when unreferenced: the row that points at
+#a fresh upload may not be committed yet
+GC_GRACE_SECONDS = getattr(settings, "MEDIA_BLOB_GC_GRACE_SECONDS", 24 * 60 * 60)
+
+#model -> file field names
+_registry = {}
+
+
+def register(model, *fields):
+    _registry[model] = fields
+
+
+def blob_name(digest, ext):
+    return f"{BLOB_DIR}/{digest[:2]}/{digest}{ext.lower()}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        #the final name comes from the content in _save, never from the upload
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        directory = self.path(BLOB_DIR)
+        os.makedirs(directory, exist_ok=True)
+
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix=".upload")
+        try:
+            with os.fdopen(handle, "wb") as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+
+            name = blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+            path = self.path(name)
+            if os.path.exists(path):
+                #a fresh reference to an old blob, keep it out of the next collect_garbage
+                os.utime(path)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+            return name
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+def references():
+    """Counter of media file name -> number of rows that point at it, across registered fields."""
+    counts = Counter()
+    for model, fields in _registry.items():
+        for field in fields:
+            rows = model._default_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            counts.update(rows.values_list(field, flat=True))
+    return counts
+
+
+def blobs(storage=default_storage):
+    """Every stored blob name."""
+    for prefix in storage.listdir(BLOB_DIR)[0] if storage.exists(BLOB_DIR) else ():
+        for name in storage.listdir(f"{BLOB_DIR}/{prefix}")[1]:
+            if not name.endswith(".upload"):
+                yield f"{BLOB_DIR}/{prefix}/{name}"
+
+
+def derivatives(storage=default_storage):
+    """(name, source sha256) of every stored image derivative."""
+    from .images import DERIVATIVE_DIR
+
+    for prefix in storage.listdir(DERIVATIVE_DIR)[0] if storage.exists(DERIVATIVE_DIR) else ():
+        for name in storage.listdir(f"{DERIVATIVE_DIR}/{prefix}")[1]:
+            if not name.endswith(".tmp"):
+                yield f"{DERIVATIVE_DIR}/{prefix}/{name}", name.split("-")[0]
+
+
+def _referenced_digests(referenced, storage):
+    """SHA-256 of every referenced file: blobs carry it in their name, older uploads are hashed."""
+    from .images import content_hash
+
+    digests = set()
+    for name in referenced:
+        if name.startswith(f"{BLOB_DIR}/"):
+            digests.add(os.path.splitext(os.path.basename(name))[0])
+        elif storage.exists(name):
+            digests.add(content_hash(storage.path(name)))
+    return digests
+
+
+def collect_garbage(storage=default_storage, grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    """
+    Delete blobs with no references that are older than `grace_seconds`,
+    and the derivatives of files nothing references any more. Returns
+    (names, bytes).
+    """
+    referenced = references()
+    cutoff = time.time() - grace_seconds
+    removed, freed = [], 0
+
+    def delete(name):
+        nonlocal freed
+        removed.append(name)
+        freed += os.path.getsize(storage.path(name))
+        if not dry_run:
+            storage.delete(name)
+
+    collected = set()
+    for name in blobs(storage):
+        if referenced[name] or os.path.getmtime(storage.path(name)) > cutoff:
+            continue
+        delete(name)
+        collected.add(os.path.splitext(os.path.basename(name))[0])
+
+    #derivatives of a collected blob go with it, other unreferenced ones after the grace period
+    live = _referenced_digests(referenced, storage)
+    for name, digest in derivatives(storage):
+        if digest in live:
+            continue
+        if digest in collected or os.path.getmtime(storage.path(name)) <= cutoff:
+            delete(name)
+    return removed, freed
+
+
+def adopt(storage=default_storage):
+    """
+    Move rows that still point at files saved before this storage (outside
+    BLOB_DIR) onto blobs, so duplicates collapse into one. The old files are
+    left in place. Returns the number of rows updated.
+    """
+    updated = 0
+    for model, fields in _registry.items():
+        for field in fields:
+            names = model._default_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).values_list(field, flat=True).distinct()
+            for name in list(names):
+                if name.startswith(f"{BLOB_DIR}/") or not storage.exists(name):
+                    continue
+                with storage.open(name) as source:
+                    blob = storage.save(name, source)
+                updated += model._default_manager.filter(**{field: name}).update(**{field: blob})
+    return updated
@@ -0,0 +1,45 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from main.images import DERIVATIVE_SIZES, derivatives
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ", ".join(f"{url} {width}w" for url, width in entries)
+
+
+def _pick(entries, width):
+    #smallest derivative at least as wide as the slot, else the largest there is
+    for url, entry_width in entries:
+        if entry_width >= width:
+            return url
+    return entries[-1][0]
+
+
+@register.simple_tag
+def responsive_image(image, size="card", sizes=None, **attrs):
+    """
+    {% responsive_image translator.image "card" alt=translator.name class="w-100" %}
+
+    Renders a <picture> with WebP and JPEG/PNG srcsets from main/images.py,
+    or a plain <img> of the original while the derivatives don't exist yet.
+    Extra keyword arguments become attributes (data_id -> data-id).
+    """
+    if not image:
+        return ""
+    attrs.setdefault("alt", "")
+    attrs.setdefault("loading", "lazy")
+    attributes = format_html_join("", ' {}="{}"', ((name.replace("_", "-"), value) for name, value in attrs.items()))
+
+    info = derivatives(image)
+    if not info or not info.get("webp"):
+        return format_html('<img src="{}"{}>', image.url, attributes)
+
+    width = min(DERIVATIVE_SIZES.get(size, DERIVATIVE_SIZES["card"]), info["width"])
+    sizes = sizes or f"{width}px"
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}"><img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(info["webp"]), sizes, _pick(info["fallback"], width), _srcset(info["fallback"]), sizes, attributes,
+    )
@@ -1,3 +1,520 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.template import Context, Template
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Profile
+from companies.models import Company
+from main.models import Contact, SearchTerm, SeedState
+from main import images, queryplans, search, seed, storage
+from main.cache import bump, forget_group_versions, group_versions, groups_for, version_cache
+from main.routers import STICKY_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware, pin_to_primary
+from main.statemachine import TransitionError
+from translation_request.models import TranslationRequest
+from translation_request.states import request_states
+from translators.models import Translator
+from PIL import Image
 
 # Create your tests here.
+
+
+@override_settings(VERSION_CHECK_SECONDS=60)
+class ViewCacheTest(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        forget_group_versions()
+        self.translator = Translator.objects.create(name="Cached Translator", experience="-", rating=5)
+
+    def test_anonymous_responses_are_cached_until_a_translator_changes(self):
+        url = reverse("main:home_view")
+        self.assertNotIn("X-View-Cache", self.client.get(url))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-View-Cache"], "hit")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.translator.name = "Renamed Translator"
+            self.translator.save()
+
+        response = self.client.get(url)
+        self.assertNotIn("X-View-Cache", response)
+        self.assertContains(response, "Renamed Translator")
+
+    def test_signed_in_users_bypass_the_cache(self):
+        user = User.objects.create_user("member", password="secret")
+        Profile.objects.create(user=user)
+        self.client.force_login(user)
+
+        url = reverse("main:home_view")
+        self.client.get(url)
+        self.assertNotIn("X-View-Cache", self.client.get(url))
+
+
+class SearchTest(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.both = Translator.objects.create(name="Legal Translator", experience="Contracts and court rulings")
+            self.name_only = Translator.objects.create(name="Translation Office", experience="-")
+            self.experience_only = Translator.objects.create(name="Sara", experience="Legal documents, legal review")
+            self.request = TranslationRequest.objects.create(company_name="Acme Trading", description="Annual report", company_type="private", request_type="hire")
+
+    def test_words_match_as_prefixes_and_rank_by_matched_words_then_weight(self):
+        #equal scores fall back to the id
+        self.assertEqual([pk for pk, _ in search.search(Translator, "transl")], [self.both.pk, self.name_only.pk])
+        #both words beat one; the name field is boosted over experience
+        self.assertEqual([pk for pk, _ in search.search(Translator, "leg transl")], [self.both.pk, self.name_only.pk, self.experience_only.pk])
+        self.assertEqual(search.search_objects(Translator, "LEGAL", limit=1), [self.both])
+        self.assertEqual(search.search(Translator, "a"), [])
+        #LIKE wildcards in a query are plain characters
+        self.assertEqual(search.search(Translator, "leg_l"), [])
+
+    def test_index_follows_saves_and_deletes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.name_only.name = "Interpreting Office"
+            self.name_only.save()
+            #nothing is indexed until the transaction commits
+            self.assertEqual([pk for pk, _ in search.search(Translator, "interpret")], [])
+        self.assertEqual([pk for pk, _ in search.search(Translator, "interpret")], [self.name_only.pk])
+        self.assertEqual([pk for pk, _ in search.search(Translator, "translation")], [])
+
+        pk = self.both.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.both.delete()
+        self.assertFalse(SearchTerm.objects.filter(object_id=pk, content_type__model="translator").exists())
+
+    def test_rebuild_command_restores_the_index(self):
+        SearchTerm.objects.all().delete()
+        output = io.StringIO()
+        call_command("rebuild_search_index", "--batch-size", "2", stdout=output)
+        self.assertIn("Indexed 3 translators", output.getvalue())
+        self.assertEqual([pk for pk, _ in search.search(TranslationRequest, "acme")], [self.request.pk])
+
+        #deploys only fill models that were never indexed, e.g. rows from before the index existed
+        SearchTerm.objects.filter(content_type__model="translator").delete()
+        output = io.StringIO()
+        call_command("rebuild_search_index", "--missing", stdout=output)
+        self.assertIn("Indexed 3 translators", output.getvalue())
+        self.assertIn("translation requests already indexed, skipped", output.getvalue())
+        self.assertEqual(len(search.search(Translator, "transl")), 2)
+
+    def test_admin_search_uses_the_index(self):
+        TranslationRequest.objects.create(company_name="Other", description="-", company_type="private", request_type="hire")
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        response = self.client.get(reverse("admin:translation_request_translationrequest_changelist"), {"q": "annual rep"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.request])
+
+
+class ExportTest(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user("finance", "finance@example.com", "password", is_staff=True)
+        TranslationRequest.objects.create(company_name="=HYPERLINK(\"x\")", company_type="private", request_type="hire", status="pending")
+        TranslationRequest.objects.create(company_name="شركة", company_type="private", request_type="instant", status="accepted")
+        old = TranslationRequest.objects.create(company_name="Old", company_type="private", request_type="hire", status="pending")
+        TranslationRequest.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=40))
+
+    def test_csv_stream_with_filters(self):
+        self.client.force_login(self.staff)
+        since = (timezone.localdate() - datetime.timedelta(days=7)).isoformat()
+        response = self.client.get(reverse("main:export_view", args=["requests", "csv"]), {"status": "pending", "from": since})
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual(rows[0][:3], ["id", "company_name", "company_user"])
+        #formula-looking cells are neutralised, the old request is outside the date range
+        self.assertEqual([row[1] for row in rows[1:]], ["'=HYPERLINK(\"x\")"])
+
+    def test_ndjson_command_and_bad_filters(self):
+        output = io.StringIO()
+        call_command("export_data", "requests", "--format", "ndjson", "--status", "accepted", stdout=output)
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([row["company_name"] for row in rows], ["شركة"])
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse("main:export_view", args=["requests", "csv"]), {"status": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("main:export_view", args=["invoices", "xml"])).status_code, 400)
+
+    def test_export_needs_staff(self):
+        response = self.client.get(reverse("main:export_view", args=["invoices", "csv"]))
+        self.assertRedirects(response, reverse("accounts:sign_in"), fetch_redirect_response=False)
+
+
+class StateMachineTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("company", "company@example.com", "password")
+        self.request = TranslationRequest.objects.create(company=self.user, company_name="Acme", company_type="private", request_type="hire")
+        self.translator = Translator.objects.create(name="Translator", experience="-")
+
+    def test_transition_is_conditional_and_logged(self):
+        stale = TranslationRequest.objects.get(pk=self.request.pk)
+
+        request_states.transition(self.request, "assigned", user=self.user, translator=self.translator)
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.status, self.request.translator), ("assigned", self.translator))
+
+        #a second writer that loaded the row before the change can't overwrite it
+        with self.assertRaises(TransitionError):
+            request_states.transition(stale, "rejected")
+        self.assertEqual(TranslationRequest.objects.get(pk=self.request.pk).status, "assigned")
+
+        #not in the table at all
+        with self.assertRaises(TransitionError), self.assertNumQueries(0):
+            request_states.transition(self.request, "pending_review")
+
+        history = list(request_states.history(self.request).values_list("source", "target", "user"))
+        self.assertEqual(history, [("pending", "assigned", self.user.pk)])
+
+    def test_reassignment_is_conditional_on_the_translator(self):
+        other = Translator.objects.create(name="Other", experience="-")
+        request_states.transition(self.request, "assigned", translator=self.translator)
+        stale = TranslationRequest.objects.get(pk=self.request.pk)
+
+        request_states.transition(self.request, "assigned", user=self.user, translator=other)
+        self.assertEqual(TranslationRequest.objects.get(pk=self.request.pk).translator, other)
+
+        #the status didn't change, but the translator the second writer saw did
+        with self.assertRaises(TransitionError):
+            request_states.transition(stale, "assigned", translator=self.translator)
+        self.assertEqual(TranslationRequest.objects.get(pk=self.request.pk).translator, other)
+        self.assertEqual(list(request_states.history(self.request).values_list("source", "target")), [("pending", "assigned"), ("assigned", "assigned")])
+
+
+class ImageDerivativeTest(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        #the worker threads can't write to a database cache while the test's transaction holds SQLite's lock
+        caches_setting = {**settings.CACHES, "images": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-images"}}
+        overridden = override_settings(MEDIA_ROOT=self.media, CACHES=caches_setting)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        images.image_cache().clear()
+        images.forget_derivatives()
+
+    def _png(self, width, height):
+        output = io.BytesIO()
+        Image.new("RGB", (width, height), "teal").save(output, "PNG")
+        return ContentFile(output.getvalue(), name="screenshot.png")
+
+    def _render(self, translator):
+        return Template('{% load images %}{% responsive_image translator.image "card" alt=translator.name %}').render(Context({"translator": translator}))
+
+    def test_derivatives_are_generated_on_upload_and_shared_by_content(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Translator.objects.create(name="First", experience="-", image=self._png(1600, 800))
+        #a copy uploaded before content-addressed storage, under another name
+        os.makedirs(os.path.join(self.media, "images"))
+        shutil.copy(first.image.path, os.path.join(self.media, "images", "screenshot_9KXpTjU.png"))
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Translator.objects.create(name="Second", experience="-", image="images/screenshot_9KXpTjU.png")
+        images.wait()
+
+        html = self._render(first)
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn("-96.webp 96w", html)
+        self.assertIn("-1200.jpg 1200w", html)
+        #the slot is 400px wide, the fallback src is the 400px JPEG
+        self.assertIn('-400.jpg" srcset=', html)
+        #same bytes, same files
+        self.assertEqual(images.derivatives(first.image), images.derivatives(second.image))
+
+        derivative_dir = os.path.join(self.media, images.DERIVATIVE_DIR)
+        files = [name for _, _, names in os.walk(derivative_dir) for name in names]
+        self.assertEqual(len(files), 6)
+        with Image.open(os.path.join(self.media, images.derivatives(first.image)["webp"][0][0].removeprefix("/media/"))) as thumb:
+            self.assertEqual(thumb.size, (96, 48))
+
+    def test_original_is_served_until_derivatives_exist(self):
+        translator = Translator.objects.create(name="Pending", experience="-", image=self._png(200, 100))
+        html = self._render(translator)
+        self.assertEqual(html, f'<img src="{translator.image.url}" alt="Pending" loading="lazy">')
+
+        #the tag queued the missing image itself, small images are never upscaled
+        images.wait()
+        self.assertEqual([width for _, width in images.derivatives(translator.image)["webp"]], [96, 200])
+
+        #the backfill command picks up files that were never generated
+        images.image_cache().clear()
+        images.forget_derivatives()
+        call_command("generate_image_derivatives", stdout=io.StringIO())
+        self.assertIn("<picture>", self._render(translator))
+
+    def test_existing_derivatives_are_not_generated_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            translator = Translator.objects.create(name="Generated", experience="-", image=self._png(600, 300))
+        images.wait()
+        info = images.derivatives(translator.image)
+
+        #another worker, or a cleared cache: the files are found without decoding the source
+        images.image_cache().clear()
+        with mock.patch.object(images.ImageOps, "exif_transpose", side_effect=AssertionError("decoded")):
+            self.assertEqual(images.generate(translator.image.name), info)
+
+
+class ContentAddressedStorageTest(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = Translator.objects.create(name="First", experience="-", image=ContentFile(b"same bytes", name="Screenshot.PNG"))
+        second = Translator.objects.create(name="Second", experience="-", image=ContentFile(b"same bytes", name="copy of screenshot.png"))
+        other = Translator.objects.create(name="Other", experience="-", image=ContentFile(b"other bytes", name="other.png"))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith("blobs/") and first.image.name.endswith(".png"))
+        self.assertEqual(sorted(storage.blobs()), sorted([first.image.name, other.image.name]))
+        self.assertEqual(storage.references()[first.image.name], 2)
+
+        #one of two references dropped, the blob stays; the last one dropped, it goes
+        first.delete()
+        self.assertEqual(storage.collect_garbage(grace_seconds=0), ([], 0))
+        second.delete()
+        self.assertEqual(storage.collect_garbage(grace_seconds=0), ([second.image.name], len(b"same bytes")))
+        self.assertTrue(default_storage.exists(other.image.name))
+
+    def test_fresh_blobs_survive_and_legacy_files_are_adopted(self):
+        os.makedirs(os.path.join(self.media, "images"))
+        for name in ("flag.gif", "flag_LQxeElw.gif"):
+            with open(os.path.join(self.media, "images", name), "wb") as legacy:
+                legacy.write(b"GIF89a flag")
+        Translator.objects.create(name="A", experience="-", image="images/flag.gif")
+        Translator.objects.create(name="B", experience="-", image="images/flag_LQxeElw.gif")
+        default_storage.save("orphan.png", ContentFile(b"not referenced"))
+
+        output = io.StringIO()
+        call_command("collect_media_blobs", "--adopt", stdout=output)
+        self.assertIn("Moved 2 rows onto blobs", output.getvalue())
+        #the orphan was uploaded just now, inside the grace period
+        self.assertIn("Deleted 0 blobs", output.getvalue())
+        self.assertEqual(len(set(Translator.objects.values_list("image", flat=True))), 1)
+        self.assertEqual(len(list(storage.blobs())), 2)
+
+    def test_uploading_an_old_blob_again_restarts_its_grace_period(self):
+        name = default_storage.save("first.png", ContentFile(b"uploaded twice"))
+        os.utime(default_storage.path(name), (0, 0))
+        #the row that will point at the new upload isn't committed yet
+        self.assertEqual(default_storage.save("second.png", ContentFile(b"uploaded twice")), name)
+        self.assertEqual(storage.collect_garbage(grace_seconds=3600), ([], 0))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_derivatives_are_collected_with_their_source(self):
+        def png(color):
+            output = io.BytesIO()
+            Image.new("RGB", (120, 60), color).save(output, "PNG")
+            return ContentFile(output.getvalue(), name="image.png")
+
+        dropped = Translator.objects.create(name="Dropped", experience="-", image=png("teal"))
+        kept = Translator.objects.create(name="Kept", experience="-", image=png("navy"))
+        #an upload from before content-addressed storage keeps its derivatives too
+        os.makedirs(os.path.join(self.media, "images"))
+        with open(os.path.join(self.media, "images", "legacy.png"), "wb") as legacy:
+            legacy.write(png("olive").read())
+        Translator.objects.create(name="Legacy", experience="-", image="images/legacy.png")
+        for name in (dropped.image.name, kept.image.name, "images/legacy.png"):
+            images.generate(name)
+        self.assertEqual(len(list(storage.derivatives())), 12)
+
+        digest = os.path.splitext(os.path.basename(dropped.image.name))[0]
+        dropped_derivatives = sorted(name for name, source in storage.derivatives() if source == digest)
+        dropped.delete()
+        #the blob is past its grace period, its derivatives (made later) go with it
+        os.utime(default_storage.path(dropped.image.name), (0, 0))
+        removed, _ = storage.collect_garbage(grace_seconds=3600)
+        self.assertEqual(removed[0], dropped.image.name)
+        self.assertEqual(sorted(removed[1:]), dropped_derivatives)
+        kept_digest = os.path.splitext(os.path.basename(kept.image.name))[0]
+        legacy_digest = images.content_hash(os.path.join(self.media, "images", "legacy.png"))
+        self.assertEqual({source for _, source in storage.derivatives()}, {kept_digest, legacy_digest})
+
+
+class DatabaseMetricsTest(TestCase):
+
+    def test_metrics_are_staff_only(self):
+        response = self.client.get(reverse("main:db_metrics_view"))
+        self.assertRedirects(response, reverse("accounts:sign_in"), fetch_redirect_response=False)
+
+        staff = User.objects.create_user("staff", "staff@example.com", "password", is_staff=True)
+        self.client.force_login(staff)
+        metrics = self.client.get(reverse("main:db_metrics_view")).json()["default"]
+        self.assertEqual(metrics["vendor"], "sqlite")
+        #development SQLite keeps its connection between requests, no pool
+        self.assertTrue(metrics["persistent"])
+        self.assertIsNone(metrics["pool"])
+        self.assertGreaterEqual(metrics["connections_opened"], 1)
+
+
+class QueryPlanAuditTest(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        Contact.objects.create(first_name="A", last_name="B", email="a@example.com", message="-")
+        output = io.StringIO()
+        #even a one row table must not be scanned
+        call_command("audit_query_plans", "--threshold", "0", stdout=output)
+        self.assertIn("ok   request list by type", output.getvalue())
+        self.assertNotIn("FAIL", output.getvalue())
+
+    def test_unindexed_query_fails_the_audit(self):
+        Contact.objects.create(first_name="A", last_name="B", email="a@example.com", message="-")
+        queryplans.register("contact by email", lambda: Contact.objects.filter(email="a@example.com"))
+        self.addCleanup(queryplans._registry.pop, "contact by email")
+
+        self.assertEqual(queryplans.full_scans(Contact.objects.filter(email="a@example.com")), [("main_contact", 1)])
+        with self.assertRaisesMessage(CommandError, "contact by email"):
+            call_command("audit_query_plans", "--threshold", "0", stdout=io.StringIO())
+        #below the threshold a full scan is fine
+        call_command("audit_query_plans", "--threshold", "1", stdout=io.StringIO())
+
+
+#TestCase wraps every test in atomic(), which pins reads to the primary
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingTest(TransactionTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        #records where the view's reads would go
+        self.middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(self.router.db_for_read(Translator)))
+
+    def test_reads_go_to_replicas_and_writes_to_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Translator), "replica1")
+        self.assertEqual(self.router.db_for_write(Translator), "default")
+        with pin_to_primary():
+            self.assertEqual(self.router.db_for_read(Translator), "default")
+        self.assertFalse(self.router.allow_migrate("replica1", "translators"))
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Translator), "default")
+
+    def test_browser_reads_its_own_writes(self):
+        factory = RequestFactory()
+        post = self.middleware(factory.post("/contact/"))
+        self.assertEqual(post.content, b"default")
+        self.assertIn(STICKY_COOKIE, post.cookies)
+
+        #the next request of the same browser is pinned, another browser isn't
+        sticky = factory.get("/")
+        sticky.COOKIES[STICKY_COOKIE] = post.cookies[STICKY_COOKIE].value
+        self.assertEqual(self.middleware(sticky).content, b"default")
+        expired = factory.get("/")
+        expired.COOKIES[STICKY_COOKIE] = "0"
+        self.assertEqual(self.middleware(expired).content, b"replica1")
+
+    def test_a_get_that_writes_reads_the_primary_afterwards(self):
+        #like the emailed "issue invoice" link: write on a GET, then read the row back
+        def view(request):
+            before = self.router.db_for_read(Translator)
+            Translator.objects.create(name="Written on GET", experience="-")
+            return HttpResponse(f"{before} {self.router.db_for_read(Translator)}")
+
+        response = ReplicaRoutingMiddleware(view)(RequestFactory().get("/payment/issue/1/1/"))
+        self.assertEqual(response.content, b"replica1 default")
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        #a GET that only reads leaves no cookie
+        self.assertNotIn(STICKY_COOKIE, self.middleware(RequestFactory().get("/")).cookies)
+
+    def test_version_store_reads_the_primary_and_filling_it_leaves_no_cookie(self):
+        version_cache().clear()
+        forget_group_versions()
+        cache_model = version_cache().cache_model_class
+
+        def view(request):
+            group_versions(["translators"])
+            return HttpResponse(self.router.db_for_read(cache_model))
+
+        response = ReplicaRoutingMiddleware(view)(RequestFactory().get("/"))
+        self.assertEqual(response.content, b"default")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_bumps_on_the_database_cache_count_up(self):
+        version_cache().clear()
+        first, = bump("translators")
+        self.assertEqual(bump("translators", "translators"), [first + 2, first + 2])
+        forget_group_versions()
+        self.assertEqual(group_versions(["translators"]), [first + 2])
+
+    @override_settings(DATABASE_REPLICAS=["replica1", "replica2", "replica3"])
+    def test_one_replica_per_request(self):
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(" ".join(self.router.db_for_read(Translator) for _ in range(20))))
+        for _ in range(10):
+            self.assertEqual(len(set(middleware(RequestFactory().get("/")).content.split())), 1)
+
+
+class SQLiteTuningTest(TestCase):
+
+    def test_connections_run_the_pragmas(self):
+        with connection.cursor() as cursor:
+            pragmas = {name: cursor.execute(f"PRAGMA {name}").fetchone()[0] for name in ("synchronous", "busy_timeout", "temp_store")}
+        #1 = NORMAL, 2 = MEMORY (the in-memory test database can't switch to WAL)
+        self.assertEqual(pragmas, {"synchronous": 1, "busy_timeout": settings.SQLITE_PRAGMAS["busy_timeout"], "temp_store": 2})
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+
+class SeedTest(TestCase):
+
+    def test_seeding_upserts_once_and_skips_unchanged_fixtures(self):
+        loaded = seed.seed()
+        self.assertEqual(loaded, SeedState.objects.get().objects_loaded)
+        company = Company.objects.get(pk=3)
+        self.assertEqual(sorted(company.languages.values_list("pk", flat=True)), [2, 3])
+        #created_at comes from the fixture, not the time of seeding
+        self.assertEqual(TranslationRequest.objects.get(pk=1).created_at.year, 2025)
+
+        #unchanged fixtures cost a single query
+        with self.assertNumQueries(1):
+            self.assertIsNone(seed.seed())
+
+        #a forced run restores seeded rows without duplicating them
+        Company.objects.filter(pk=3).update(name="Renamed")
+        company.languages.clear()
+        self.assertEqual(seed.seed(force=True), loaded)
+        self.assertEqual(Company.objects.get(pk=3).name, "STC")
+        self.assertEqual(company.languages.count(), 2)
+        self.assertEqual(Company.objects.count(), 3)
+
+    def test_seeding_bumps_the_groups_of_the_seeded_models(self):
+        self.assertEqual(groups_for([Translator]), ["matching", "translators"])
+        #versions remembered by earlier tests were rolled back in the store
+        forget_group_versions()
+        companies, translators = group_versions(["companies", "translators"])
+        #the fixtures hold companies and their lookup tables, no translators
+        with self.captureOnCommitCallbacks(execute=True):
+            seed.seed()
+        forget_group_versions()
+        self.assertNotEqual(group_versions(["companies"]), [companies])
+        self.assertEqual(group_versions(["translators"]), [translators])
+
+    def test_command_reports_skips(self):
+        call_command("seed_data", stdout=io.StringIO())
+        output = io.StringIO()
+        call_command("seed_data", stdout=output)
+        self.assertIn("unchanged, skipped", output.getvalue())
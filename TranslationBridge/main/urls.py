@@ -7,4 +7,7 @@ urlpatterns = [
     path("", views.home_view, name="home_view"), 
     path("contact/", views.contact_view, name="contact_view"),
     path("message/", views.contact_message_view, name="contact_message_view"),
+    path("search/", views.search_view, name="search_view"),
+    path("export/<slug:name>.<slug:format>", views.export_view, name="export_view"),
+    path("metrics/db/", views.db_metrics_view, name="db_metrics_view"),
 ]
\ No newline at end of file
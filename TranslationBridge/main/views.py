@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, HttpRequest
+from django.http import HttpResponse, HttpRequest, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from companies.models import Company
 from translators.models import Translator
 
@@ -8,13 +8,27 @@ from django.contrib import messages
 
 #for sending email message
 from django.conf import settings
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from notifications.outbox import enqueue_email
+from notifications.rendering import render_email
 
 #import contact model
 from main.models import Contact
 
+#for caching public pages
+from main.cache import cache_view
+
+#full-text search
+from main import search
+
+#streaming exports
+from main import exports
+
+#database connection metrics
+from main import db
+from translation_request.models import TranslationRequest
+
 # Create your views here.
+@cache_view("translators", "companies")
 def home_view(request: HttpRequest):
 
     best_translators_filter = Translator.objects.filter( rating__gte = 1).order_by('-rating')
@@ -32,13 +46,9 @@ def contact_view(request: HttpRequest):
         new_msg = Contact( first_name = request.POST["first_name"], last_name = request.POST["last_name"], email = request.POST["email"], message = request.POST["message"])
         new_msg.save()
 
-        #send confirmation email
-        content_html = render_to_string ("main/mail/configration.html")
-        send_to = new_msg.email
-        email_message = EmailMessage("Message sending confirmation",  content_html, settings.EMAIL_HOST_USER, {send_to})
-        email_message.content_subtype = "html"
-
-        email_message.send()       
+        #queue confirmation email (delivered by the email worker)
+        content = render_email("main/mail/configration.html")
+        enqueue_email("Message sending confirmation", content.text, new_msg.email, html_body=content.html, from_email=settings.EMAIL_HOST_USER, dedup_key=f"contact-confirmation:{new_msg.pk}")
 
         messages.success(request, "The message sends successfully", "alert-success")
         return redirect('main:home_view')
@@ -50,4 +60,53 @@ def contact_message_view(request:HttpRequest):
 
     msg = Contact.objects.all().order_by("-created_at")
     
-    return render(request, "main/message.html", {"msg":msg})
\ No newline at end of file
+    return render(request, "main/message.html", {"msg":msg})
+
+
+#Search view (translators for everyone, requests for signed in users)
+def search_view(request:HttpRequest):
+
+    query = request.GET.get("q", "").strip()
+    translators = []
+    requests = []
+
+    if query:
+        translators = search.search_objects(Translator, query, queryset=Translator.objects.select_related("city"))
+        if request.user.is_authenticated:
+            requests = search.search_objects(TranslationRequest, query)
+
+    return render(request, "main/search.html", {"query": query, "translators": translators, "requests": requests})
+
+
+
+def export_view(request:HttpRequest, name:str, format:str):
+
+    #finance exports are for staff only
+    if not request.user.is_staff:
+        messages.error(request, "Only staff members can export data", "alert-danger")
+        return redirect("accounts:sign_in")
+
+    try:
+        lines = exports.stream(
+            name,
+            format,
+            status=request.GET.get("status"),
+            date_from=request.GET.get("from"),
+            date_to=request.GET.get("to"),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(lines, content_type=exports.FORMATS[format])
+    response["Content-Disposition"] = f'attachment; filename="{name}.{format}"'
+    return response
+
+
+
+def db_metrics_view(request:HttpRequest):
+
+    if not request.user.is_staff:
+        messages.error(request, "Only staff members can view metrics", "alert-danger")
+        return redirect("accounts:sign_in")
+
+    return JsonResponse(db.connection_metrics())
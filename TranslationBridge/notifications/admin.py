@@ -0,0 +1,29 @@
+from django.contrib import admin
+from .models import OutboundEmail, Notification, RequestFanOut
+
+# Register your models here.
+class OutboundEmailAdmin(admin.ModelAdmin):
+
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "dedup_key")
+
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
+
+
+class NotificationAdmin(admin.ModelAdmin):
+
+    list_display = ("title", "user", "kind", "created_at", "read_at", "emailed_at")
+    list_filter = ("kind",)
+
+
+admin.site.register(Notification, NotificationAdmin)
+
+
+class RequestFanOutAdmin(admin.ModelAdmin):
+
+    list_display = ("request", "attempts", "next_attempt_at", "created_at")
+
+
+admin.site.register(RequestFanOut, RequestFanOutAdmin)
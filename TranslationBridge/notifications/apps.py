@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'notifications'
+
+    def ready(self):
+        #register signal handlers
+        from . import signals
+
+        from django.utils.autoreload import file_changed
+        from .rendering import clear_render_cache
+
+        #runserver: an edited mail template must not keep serving the cached body
+        def template_changed(sender, file_path, **kwargs):
+            if file_path.suffix in (".html", ".txt"):
+                clear_render_cache()
+
+        file_changed.connect(template_changed, weak=False, dispatch_uid="notifications-render-cache")
@@ -0,0 +1,212 @@
+"""
+SMTP email backend with a process-wide connection pool.
+
+Django's SMTP backend opens (TCP + STARTTLS + AUTH) and quits a session for
+every send_messages() call. PooledEmailBackend hands the authenticated
+session back to a pool on close() instead, so the next batch (or the next
+get_connection() in the same process) reuses it. Pooled sessions are
+checked with NOOP before reuse and dropped once idle for longer than
+EMAIL_POOL_IDLE_SECONDS; a session the server closed mid-batch is replaced
+and the message retried once.
+
+    EMAIL_BACKEND = "notifications.backends.PooledEmailBackend"
+    EMAIL_POOL_SIZE = 2               # idle sessions kept per server/account
+    EMAIL_POOL_IDLE_SECONDS = 60
+
+pool_metrics() reports throughput and how often sessions were reused.
+"""
+import atexit
+import smtplib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+
+
+def _disconnected(error):
+    #SMTPException subclasses OSError, only socket errors and a closed session mean the session is gone
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+class _Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.messages_sent = 0
+            self.send_seconds = 0.0
+            self.connections_opened = 0
+            self.connections_reused = 0
+            self.reconnects = 0
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            checkouts = self.connections_opened + self.connections_reused
+            return {
+                "messages_sent": self.messages_sent,
+                "send_seconds": round(self.send_seconds, 3),
+                "messages_per_second": round(self.messages_sent / self.send_seconds, 2) if self.send_seconds else 0.0,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connections_reused,
+                "reconnects": self.reconnects,
+                "reuse_ratio": round(self.connections_reused / checkouts, 3) if checkouts else 0.0,
+            }
+
+
+class _Pool:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        #(host, port, username, tls, ssl) -> [(smtp session, returned at), ...]
+        self._idle = defaultdict(list)
+
+    def checkout(self, key, max_idle_seconds):
+        """Return the most recently used live-looking session for `key`, or None."""
+        with self._lock:
+            now = time.monotonic()
+            idle = self._idle[key]
+            fresh = [(session, returned_at) for session, returned_at in idle if now - returned_at <= max_idle_seconds]
+            expired = [session for session, returned_at in idle if now - returned_at > max_idle_seconds]
+            #most recently returned first, it is the least likely to have been dropped by the server
+            session = fresh.pop()[0] if fresh else None
+            idle[:] = fresh
+        for candidate in expired:
+            _quit(candidate)
+        return session
+
+    def checkin(self, key, session, max_size):
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < max_size:
+                idle.append((session, time.monotonic()))
+                return True
+        return False
+
+    def clear(self):
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session, _ in idle]
+            self._idle.clear()
+        for session in sessions:
+            _quit(session)
+
+
+def _quit(session):
+    try:
+        session.quit()
+    except OSError:
+        session.close()
+
+
+def _alive(session):
+    try:
+        return session.noop()[0] == 250
+    except OSError:
+        return False
+
+
+_pool = _Pool()
+_metrics = _Metrics()
+
+
+def pool_metrics():
+    return _metrics.snapshot()
+
+
+def reset_pool_metrics():
+    _metrics.reset()
+
+
+def close_pooled_connections():
+    """Quit every idle pooled session (tests, shutdown)."""
+    _pool.clear()
+
+
+atexit.register(close_pooled_connections)
+
+
+class PooledEmailBackend(EmailBackend):
+
+    @property
+    def _pool_key(self):
+        return (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+
+    def open(self):
+        if self.connection:
+            return False
+
+        max_idle = getattr(settings, "EMAIL_POOL_IDLE_SECONDS", 60)
+        while True:
+            session = _pool.checkout(self._pool_key, max_idle)
+            if session is None:
+                break
+            if _alive(session):
+                self.connection = session
+                _metrics.add(connections_reused=1)
+                return True
+            session.close()
+
+        opened = super().open()
+        if self.connection:
+            _metrics.add(connections_opened=1)
+        return opened
+
+    def close(self):
+        if self.connection is None:
+            return
+        session, self.connection = self.connection, None
+        if not _pool.checkin(self._pool_key, session, getattr(settings, "EMAIL_POOL_SIZE", 2)):
+            _quit(session)
+
+    def _discard(self):
+        """Drop the current session without returning it to the pool."""
+        if self.connection is not None:
+            session, self.connection = self.connection, None
+            session.close()
+
+    def _send_or_reconnect(self, message):
+        try:
+            return self._send(message)
+        except OSError as error:
+            if not _disconnected(error):
+                raise
+            #the server closed the session since the last NOOP, retry once on a fresh one
+            self._discard()
+            _metrics.add(reconnects=1)
+            self.open()
+            if not self.connection:
+                return False
+            return self._send(message)
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        with self._lock:
+            new_conn_created = self.open()
+            if not self.connection:
+                return 0
+
+            started = time.perf_counter()
+            num_sent = 0
+            try:
+                for message in email_messages:
+                    if self._send_or_reconnect(message):
+                        num_sent += 1
+            except BaseException:
+                #don't hand a session in an unknown state to the next caller
+                self._discard()
+                raise
+            finally:
+                _metrics.add(messages_sent=num_sent, send_seconds=time.perf_counter() - started)
+                if new_conn_created:
+                    self.close()
+        return num_sent
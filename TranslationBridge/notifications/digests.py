@@ -0,0 +1,155 @@
+"""
+New request fan-out and email digests.
+
+When a TranslationRequest is created, a RequestFanOut row is inserted in
+the same transaction. process_fan_outs() (run by the email worker) then
+calls fan_out_request(), which looks up the translators the matching index
+ranks highest for the request and inserts one in-app Notification per
+translator in a single bulk INSERT; nothing is mailed at that point. A
+failed fan-out stays queued and is retried with the outbox's backoff.
+
+send_digests() (run by the email worker) then collects every notification
+that hasn't been emailed yet and, for each translator whose oldest pending
+notification is older than NOTIFICATION_DIGEST_SECONDS, queues ONE outbox
+email listing all of them. Ten requests posted in the same window reach a
+translator as a single email.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.urls import reverse
+from django.utils import timezone
+
+from main.routers import pin_to_primary
+
+from translation_request.models import TranslationRequest
+from translators.matching import matching_index
+from translators.models import Translator
+
+from .models import Notification, RequestFanOut
+from .outbox import MAX_ATTEMPTS, enqueue_email, retry_delay
+from .rendering import render_email
+
+
+DEFAULT_FANOUT_TOP_K = 20
+DEFAULT_DIGEST_SECONDS = 15 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out_request(request_id):
+    """Notify the best matching translators about a new request, returns the number notified."""
+    translation_request = TranslationRequest.objects.select_related("language").filter(pk=request_id).first()
+    if translation_request is None:
+        return 0
+
+    ranked = matching_index.rank(
+        city=translation_request.city,
+        language=translation_request.language,
+        specialty=translation_request.specialty,
+        k=getattr(settings, "NOTIFICATION_FANOUT_TOP_K", DEFAULT_FANOUT_TOP_K),
+    )
+    translator_ids = [pk for pk, _ in ranked]
+    if translation_request.language:
+        #ranking keeps partial matches, but a translator who doesn't speak the language can't take the job
+        speakers = set(matching_index.match(language=translation_request.language))
+        translator_ids = [pk for pk in translator_ids if pk in speakers]
+
+    user_ids = Translator.objects.filter(pk__in=translator_ids, user__isnull=False).values_list("user_id", flat=True)
+    title = f"New request from {translation_request.company_name}"
+    if translation_request.language:
+        title += f" ({translation_request.language})"
+    url = reverse("translation_request:request_detail_view", args=[translation_request.pk])
+
+    created = Notification.objects.bulk_create(
+        [
+            Notification(user_id=user_id, kind=Notification.KindChoices.NEW_REQUEST, object_id=translation_request.pk, title=title, url=url)
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+#a lagging replica may not have the request yet, and fan_out_request() would skip it for good
+@pin_to_primary()
+def process_fan_outs(batch_size=50, now=None):
+    """Run one batch of due fan-outs, returns (done, failed)."""
+    now = now or timezone.now()
+    #no claiming: notifications are unique per user and request, two workers running the same fan-out insert them once
+    due = RequestFanOut.objects.filter(attempts__lt=MAX_ATTEMPTS, next_attempt_at__lte=now).order_by("next_attempt_at", "id")[:batch_size]
+
+    done = failed = 0
+    for fan_out in due:
+        try:
+            fan_out_request(fan_out.request_id)
+        except Exception as error:
+            failed += 1
+            logger.exception("Notifying translators about request %s failed", fan_out.request_id)
+            fan_out.attempts += 1
+            fan_out.last_error = f"{type(error).__name__}: {error}"
+            fan_out.next_attempt_at = timezone.now() + retry_delay(fan_out.attempts)
+            fan_out.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+        else:
+            done += 1
+            fan_out.delete()
+    return done, failed
+
+
+def _absolute(url):
+    return getattr(settings, "SITE_URL", "").rstrip("/") + url
+
+
+def _queue_digest(user, notifications):
+    #already read in the app, no need to mail them
+    unread = [notification for notification in notifications if notification.read_at is None]
+    if not unread or not user.email:
+        return False
+
+    items = [{"title": notification.title, "url": _absolute(notification.url)} for notification in unread]
+    content = render_email("notifications/mail/digest.html", {"username": user.username, "items": items})
+    subject = unread[0].title if len(unread) == 1 else f"{len(unread)} new translation requests match your profile"
+    enqueue_email(
+        subject,
+        content.text,
+        user.email,
+        html_body=content.html,
+        dedup_key=f"digest:{user.pk}:{max(notification.pk for notification in notifications)}",
+    )
+    return True
+
+
+#reads the notifications it just marked as emailed, a lagging replica would queue them twice
+@pin_to_primary()
+def send_digests(batch_size=200, now=None):
+    """Queue one digest email per translator with due notifications, returns the number queued."""
+    now = now or timezone.now()
+    window = datetime.timedelta(seconds=getattr(settings, "NOTIFICATION_DIGEST_SECONDS", DEFAULT_DIGEST_SECONDS))
+
+    due_users = list(
+        Notification.objects
+        .filter(emailed_at__isnull=True)
+        .values("user")
+        .annotate(oldest=Min("created_at"))
+        .filter(oldest__lte=now - window)
+        .order_by("oldest")
+        .values_list("user", flat=True)[:batch_size]
+    )
+    if not due_users:
+        return 0
+
+    pending = {}
+    for notification in Notification.objects.filter(user__in=due_users, emailed_at__isnull=True).select_related("user").order_by("created_at", "id"):
+        pending.setdefault(notification.user, []).append(notification)
+
+    queued = 0
+    for user, notifications in pending.items():
+        with transaction.atomic():
+            #claim the rows first, a second worker running at the same time gets 0 and skips the user
+            claimed = Notification.objects.filter(pk__in=[notification.pk for notification in notifications], emailed_at__isnull=True).update(emailed_at=now)
+            if claimed and _queue_digest(user, notifications):
+                queued += 1
+    return queued
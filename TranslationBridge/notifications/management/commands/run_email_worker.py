@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.backends import pool_metrics
+from notifications.digests import process_fan_outs, send_digests
+from notifications.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Notify translators about new requests, queue due notification digests and deliver queued emails from the outbox (runs until stopped, or once with --once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process the due emails and exit")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to sleep when the outbox is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            notified, fan_out_failed = process_fan_outs(batch_size=options["batch_size"])
+            if notified or fan_out_failed:
+                self.stdout.write(f"Notified translators about {notified} request(s), {fan_out_failed} failed")
+
+            digests = send_digests()
+            if digests:
+                self.stdout.write(f"Queued {digests} notification digest(s)")
+
+            sent, failed = process_outbox(batch_size=options["batch_size"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed")
+                if options["verbosity"] > 1:
+                    self.stdout.write(" ".join(f"{name}={value}" for name, value in pool_metrics().items()))
+
+            if options["once"]:
+                #keep going while full batches come back
+                if sent + failed < options["batch_size"]:
+                    break
+                continue
+
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["interval"])
@@ -0,0 +1,28 @@
+import time
+from email import message_from_bytes
+
+from django.core.management.base import BaseCommand
+
+from notifications.smtp_sink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = "Run a local SMTP server that prints every received email (set EMAIL_HOST/EMAIL_PORT to it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=1025)
+
+    def handle(self, *args, **options):
+
+        def show(mail_from, recipients, data):
+            message = message_from_bytes(data)
+            self.stdout.write(f"{mail_from} -> {', '.join(recipients)}: {message['Subject']}")
+
+        with SMTPSink(options["host"], options["port"], on_message=show) as sink:
+            self.stdout.write(self.style.SUCCESS(f"SMTP sink listening on {sink.host}:{sink.port}"))
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
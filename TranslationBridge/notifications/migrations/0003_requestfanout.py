@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification'),
+        ('translation_request', '0011_request_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestFanOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='translation_request.translationrequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['attempts', 'next_attempt_at'], name='fanout_due_idx')],
+            },
+        ),
+    ]
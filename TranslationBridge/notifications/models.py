@@ -0,0 +1,90 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+# Create your models here.
+
+
+#Outgoing email waiting to be delivered by the email worker
+class OutboundEmail(models.Model):
+
+    class StatusChoices(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+
+    #the same key is only ever queued once (e.g. "invoice-issued:12")
+    dedup_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+#In-app notification, unemailed rows are also the queue the digest emails are built from
+class Notification(models.Model):
+
+    class KindChoices(models.TextChoices):
+        NEW_REQUEST = "new_request", "New matching request"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    kind = models.CharField(max_length=20, choices=KindChoices.choices)
+    #pk of the object the notification is about (a TranslationRequest for NEW_REQUEST)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    url = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    read_at = models.DateTimeField(null=True, blank=True)
+    emailed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            #fan-out is safe to repeat
+            models.UniqueConstraint(fields=["user", "kind", "object_id"], name="notification_once_per_event"),
+        ]
+        indexes = [
+            models.Index(fields=["emailed_at", "created_at"], name="notification_digest_idx"),
+            models.Index(fields=["user", "-created_at"], name="notification_inbox_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.title}"
+
+
+#New request waiting for the email worker to notify the matching translators (notifications/digests.py)
+class RequestFanOut(models.Model):
+
+    request = models.OneToOneField("translation_request.TranslationRequest", on_delete=models.CASCADE, related_name="+")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["attempts", "next_attempt_at"], name="fanout_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"Fan-out of request {self.request_id} ({self.attempts} attempts)"
@@ -0,0 +1,140 @@
+"""
+Email outbox.
+
+Views call `enqueue_email()`, which only inserts an OutboundEmail row (in
+the view's transaction, so a rolled back request never sends mail). The
+`run_email_worker` management command delivers due rows in batches over a
+single SMTP connection, retrying failures with exponential backoff.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from main.routers import pin_to_primary
+
+from .models import OutboundEmail
+
+
+#retry schedule: 1, 2, 4, 8 ... minutes, capped, then give up
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+MAX_ATTEMPTS = 8
+
+#a row left in "sending" this long belongs to a worker that died
+STALE_LOCK_SECONDS = 10 * 60
+
+
+def enqueue_email(subject, body, to, html_body="", from_email=None, dedup_key=None):
+    """
+    Queue an email for the worker and return its OutboundEmail row.
+
+    With a `dedup_key` the email is queued at most once; later calls with
+    the same key return the existing row.
+    """
+    if isinstance(to, str):
+        to = [to]
+    values = {
+        "subject": subject,
+        "body": body,
+        "html_body": html_body,
+        "from_email": from_email or settings.DEFAULT_FROM_EMAIL,
+        "to": list(to),
+    }
+
+    if dedup_key is None:
+        return OutboundEmail.objects.create(**values)
+
+    try:
+        with transaction.atomic():
+            return OutboundEmail.objects.get_or_create(dedup_key=dedup_key, defaults=values)[0]
+    except IntegrityError:
+        #a concurrent request queued the same key first
+        return OutboundEmail.objects.get(dedup_key=dedup_key)
+
+
+def retry_delay(attempts):
+    return datetime.timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def _claim(batch_size):
+    """Mark up to `batch_size` due emails as sending and return them."""
+    now = timezone.now()
+
+    OutboundEmail.objects.filter(
+        status=OutboundEmail.StatusChoices.SENDING,
+        locked_at__lt=now - datetime.timedelta(seconds=STALE_LOCK_SECONDS),
+    ).update(status=OutboundEmail.StatusChoices.PENDING, locked_at=None)
+
+    due = OutboundEmail.objects.filter(
+        status=OutboundEmail.StatusChoices.PENDING,
+        next_attempt_at__lte=now,
+    ).order_by("next_attempt_at", "id").values_list("id", flat=True)[:batch_size]
+
+    claimed = []
+    for pk in due:
+        #conditional update, so two workers never claim the same row
+        if OutboundEmail.objects.filter(pk=pk, status=OutboundEmail.StatusChoices.PENDING).update(status=OutboundEmail.StatusChoices.SENDING, locked_at=now):
+            claimed.append(pk)
+    return list(OutboundEmail.objects.filter(pk__in=claimed).order_by("next_attempt_at", "id"))
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email or None, email.to, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def _mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    email.locked_at = None
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboundEmail.StatusChoices.FAILED
+    else:
+        email.status = OutboundEmail.StatusChoices.PENDING
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=["attempts", "last_error", "locked_at", "status", "next_attempt_at"])
+
+
+def _mark_sent(email):
+    email.status = OutboundEmail.StatusChoices.SENT
+    email.sent_at = timezone.now()
+    email.locked_at = None
+    email.save(update_fields=["status", "sent_at", "locked_at"])
+
+
+#claims rows with UPDATEs on the primary and reads them back, a lagging replica would miss them
+@pin_to_primary()
+def process_outbox(batch_size=50, connection=None):
+    """Deliver one batch of due emails over one connection, returns (sent, failed)."""
+    emails = _claim(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        #SMTP server unreachable, the whole batch is retried later
+        for email in emails:
+            _mark_failed(email, error)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            try:
+                _message(email, connection).send()
+            except Exception as error:
+                failed += 1
+                _mark_failed(email, error)
+            else:
+                sent += 1
+                _mark_sent(email)
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,130 @@
+"""
+Email body rendering.
+
+render_email() returns the HTML body of a mail template together with a
+plain-text alternative generated from it. Compiled templates are kept per
+process, and so are rendered bodies whose context is plain data (strings,
+numbers, lists, dicts), keyed by template name and a hash of the context:
+a static confirmation mail renders once per process, and a bulk send with
+the same context renders once per batch.
+
+Contexts holding anything else (model instances, querysets) are rendered
+every time, since they can change behind the cache's back.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from html import unescape
+from html.parser import HTMLParser
+from typing import NamedTuple
+
+from django.template.loader import get_template
+
+
+#rendered bodies kept per process
+RENDER_CACHE_SIZE = 256
+
+
+class RenderedEmail(NamedTuple):
+    html: str
+    text: str
+
+
+_templates = {}
+_rendered = OrderedDict()
+_lock = threading.Lock()
+
+
+# ---------- plain text ----------
+
+class _TextExtractor(HTMLParser):
+    #text inside these tags never reaches the reader
+    SKIP = {"head", "style", "script", "title"}
+    BLOCK = {"p", "div", "br", "h1", "h2", "h3", "h4", "h5", "h6", "li", "tr", "table", "ul", "ol", "section"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.links = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+        elif tag == "a":
+            self.links.append(dict(attrs).get("href"))
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+        elif tag == "a" and self.links:
+            href = self.links.pop()
+            if href and not href.startswith(("#", "mailto:")):
+                self.parts.append(f" ({href})")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """Readable plain-text version of an HTML email body."""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    lines = [re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in unescape("".join(extractor.parts)).split("\n")]
+    #collapse runs of blank lines into one
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+# ---------- rendering ----------
+
+def _template(template_name):
+    template = _templates.get(template_name)
+    if template is None:
+        template = _templates[template_name] = get_template(template_name)
+    return template
+
+
+def _context_key(template_name, context):
+    try:
+        frozen = json.dumps(context, sort_keys=True, allow_nan=False)
+    except (TypeError, ValueError):
+        return None
+    return template_name, hashlib.md5(frozen.encode()).hexdigest()
+
+
+def render_email(template_name, context=None):
+    """Render `template_name` and return RenderedEmail(html, text)."""
+    context = context or {}
+    key = _context_key(template_name, context)
+
+    if key is not None:
+        with _lock:
+            rendered = _rendered.get(key)
+            if rendered is not None:
+                _rendered.move_to_end(key)
+                return rendered
+
+    html = _template(template_name).render(context)
+    rendered = RenderedEmail(html, html_to_text(html))
+
+    if key is not None:
+        with _lock:
+            _rendered[key] = rendered
+            while len(_rendered) > RENDER_CACHE_SIZE:
+                _rendered.popitem(last=False)
+    return rendered
+
+
+def clear_render_cache():
+    """Forget compiled templates and rendered bodies (template edits in development, tests)."""
+    with _lock:
+        _templates.clear()
+        _rendered.clear()
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from translation_request.models import TranslationRequest
+
+from .models import RequestFanOut
+
+
+#queue the fan-out in the request's transaction, the email worker notifies the matching translators
+@receiver(post_save, sender=TranslationRequest)
+def request_created(sender, instance, created, **kwargs):
+    if created:
+        RequestFanOut.objects.create(request=instance)
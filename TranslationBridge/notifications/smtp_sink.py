@@ -0,0 +1,110 @@
+"""
+Minimal local SMTP server that accepts every message and keeps it in memory.
+
+It stands in for smtp.gmail.com in tests and local development:
+
+    with SMTPSink() as sink:
+        with override_settings(EMAIL_HOST=sink.host, EMAIL_PORT=sink.port, EMAIL_USE_TLS=False):
+            ...
+        sink.messages  # [(mail_from, [rcpt_to, ...], raw message bytes), ...]
+
+or `python manage.py run_smtp_sink --port 1025` to watch mails arrive on
+the console. It speaks just enough of RFC 5321 for smtplib (no TLS, AUTH
+is accepted blindly).
+"""
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        sink.connections += 1
+        mail_from, recipients = None, []
+        self.reply("220 localhost SMTP sink ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("HELO", "EHLO"):
+                self.reply("250-localhost" if verb == "EHLO" else "250 localhost")
+                if verb == "EHLO":
+                    self.reply("250-AUTH PLAIN LOGIN")
+                    self.reply("250 8BITMIME")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                mail_from, recipients = command.split(":", 1)[1].strip().strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    #undo dot-stuffing
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                sink.receive(mail_from, recipients, b"".join(data))
+                mail_from, recipients = None, []
+                self.reply("250 OK queued")
+            elif verb == "RSET":
+                mail_from, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+
+    def __init__(self, host="127.0.0.1", port=0, on_message=None):
+        self.messages = []
+        self.connections = 0
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def receive(self, mail_from, recipients, data):
+        with self._lock:
+            self.messages.append((mail_from, recipients, data))
+        if self.on_message:
+            self.on_message(mail_from, recipients, data)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,274 @@
+import datetime
+import socket
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.template.base import Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from companies.models import Language as CompanyLanguage
+from main.cache import forget_group_versions
+from translation_request.models import TranslationRequest
+from translators.matching import matching_index
+from translators.models import Country, City, Language, Translator
+
+from .backends import close_pooled_connections, pool_metrics, reset_pool_metrics
+from .digests import process_fan_outs, send_digests
+from .models import Notification, OutboundEmail, RequestFanOut
+from .outbox import MAX_ATTEMPTS, enqueue_email, process_outbox, retry_delay
+from .rendering import clear_render_cache, html_to_text, render_email
+from .smtp_sink import SMTPSink
+
+# Create your tests here.
+
+
+class OutboxTest(TestCase):
+
+    def test_enqueue_only_stores_the_email_until_the_worker_runs(self):
+        enqueue_email("Hello", "Plain body", "someone@example.com", html_body="<p>Html body</p>")
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(process_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["someone@example.com"])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.StatusChoices.SENT)
+
+        #nothing left to send
+        self.assertEqual(process_outbox(), (0, 0))
+
+    def test_dedup_key_queues_an_email_once(self):
+        first = enqueue_email("Invoice", "Body", ["a@example.com"], dedup_key="invoice-issued:1")
+        second = enqueue_email("Invoice", "Body", ["a@example.com"], dedup_key="invoice-issued:1")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        email = enqueue_email("Hello", "Body", "someone@example.com")
+
+        with mock.patch.object(EmailBackend, "send_messages", side_effect=OSError("connection reset")):
+            self.assertEqual(process_outbox(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.StatusChoices.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("connection reset", email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now() + retry_delay(1) * 0.9)
+
+        #not due yet
+        self.assertEqual(process_outbox(), (0, 0))
+
+        OutboundEmail.objects.filter(pk=email.pk).update(attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        with mock.patch.object(EmailBackend, "send_messages", side_effect=OSError("connection reset")):
+            process_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.StatusChoices.FAILED)
+
+    def test_batch_is_delivered_over_one_smtp_connection(self):
+        for index in range(3):
+            enqueue_email(f"Hello {index}", "Body", f"user{index}@example.com")
+
+        with SMTPSink() as sink:
+            with override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                EMAIL_HOST=sink.host,
+                EMAIL_PORT=sink.port,
+                EMAIL_USE_TLS=False,
+                EMAIL_HOST_USER="",
+                EMAIL_HOST_PASSWORD="",
+            ):
+                self.assertEqual(process_outbox(), (3, 0))
+
+        self.assertEqual(sink.connections, 1)
+        self.assertEqual(sorted(recipients[0] for _, recipients, _ in sink.messages), ["user0@example.com", "user1@example.com", "user2@example.com"])
+
+
+
+#outside atomic(), where the router would otherwise send reads to a replica
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class WorkerReplicaTest(TransactionTestCase):
+
+    def test_worker_reads_the_primary(self):
+        #replica1 isn't a configured database here: any read routed to it would raise
+        enqueue_email("Hello", "Body", "someone@example.com")
+        self.assertEqual(process_outbox(), (1, 0))
+        self.assertEqual(send_digests(), 0)
+
+
+class PooledBackendTest(TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink().start()
+        self.addCleanup(self.sink.stop)
+        self.addCleanup(close_pooled_connections)
+        close_pooled_connections()
+        reset_pool_metrics()
+        settings = override_settings(
+            EMAIL_BACKEND="notifications.backends.PooledEmailBackend",
+            EMAIL_HOST=self.sink.host,
+            EMAIL_PORT=self.sink.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def queue(self, count):
+        for index in range(count):
+            enqueue_email(f"Hello {index}", "Body", f"user{index}@example.com")
+
+    def test_session_is_reused_across_batches(self):
+        self.queue(3)
+        self.assertEqual(process_outbox(batch_size=2), (2, 0))
+        self.assertEqual(process_outbox(batch_size=2), (1, 0))
+
+        self.assertEqual(self.sink.connections, 1)
+        metrics = pool_metrics()
+        self.assertEqual(metrics["messages_sent"], 3)
+        self.assertEqual((metrics["connections_opened"], metrics["connections_reused"]), (1, 1))
+        self.assertEqual(metrics["reuse_ratio"], 0.5)
+
+    def test_dropped_session_is_replaced_transparently(self):
+        self.queue(1)
+        process_outbox()
+
+        #the server (or a NAT timeout) closed the idle pooled session
+        backend = get_connection()
+        backend.open()
+        backend.connection.sock.shutdown(socket.SHUT_RDWR)
+        backend.close()
+
+        self.queue(2)
+        self.assertEqual(process_outbox(), (2, 0))
+        self.assertEqual(len(self.sink.messages), 3)
+        self.assertEqual(self.sink.connections, 2)
+
+    def test_reconnects_when_the_session_dies_mid_batch(self):
+        self.queue(2)
+        backend = get_connection()
+        backend.open()
+        original_send = backend._send
+        calls = []
+
+        def send_once_broken(message):
+            calls.append(message)
+            if len(calls) == 1:
+                backend.connection.sock.shutdown(socket.SHUT_RDWR)
+            return original_send(message)
+
+        backend._send = send_once_broken
+        self.assertEqual(process_outbox(connection=backend), (2, 0))
+        self.assertEqual(pool_metrics()["reconnects"], 1)
+        self.assertEqual(len(self.sink.messages), 2)
+
+
+class RenderEmailTest(TestCase):
+
+    def setUp(self):
+        clear_render_cache()
+        self.addCleanup(clear_render_cache)
+
+    def test_static_template_renders_once_with_a_text_alternative(self):
+        with mock.patch("django.template.base.Template.render", autospec=True, side_effect=Template.render) as render:
+            first = render_email("accounts/mail/configration.html")
+            second = render_email("accounts/mail/configration.html")
+        self.assertIs(first, second)
+        self.assertEqual(render.call_count, 1)
+        self.assertIn("<h1>Sign up successfully</h1>", first.html)
+        #head and style blocks don't leak into the plain text
+        self.assertEqual(first.text, "Sign up successfully\n\nwelcome to Translation Bridge World")
+
+    def test_contexts_are_cached_separately_and_objects_are_not_cached(self):
+        self.assertIsNot(render_email("accounts/mail/configration.html", {"name": "a"}), render_email("accounts/mail/configration.html", {"name": "b"}))
+        first = render_email("accounts/mail/configration.html", {"request": object()})
+        self.assertIsNot(first, render_email("accounts/mail/configration.html", {"request": object()}))
+
+    def test_html_to_text_keeps_links_and_breaks(self):
+        self.assertEqual(html_to_text('<p>Hello&amp; welcome<br>to <a href="https://example.com">the site</a></p>'), "Hello& welcome\nto the site (https://example.com)")
+
+
+class RequestFanOutTest(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        forget_group_versions()
+        matching_index.invalidate()
+        clear_render_cache()
+
+        country = Country.objects.create(name="Saudi Arabia", flag="images/Saudi-Flag.jpg")
+        riyadh = City.objects.create(name="Riyadh", country=country)
+        arabic = Language.objects.create(name="Arabic")
+        Language.objects.create(name="French")
+        self.request_language = CompanyLanguage.objects.create(name="Arabic")
+
+        self.users = []
+        for index in range(3):
+            user = User.objects.create_user(f"translator{index}", f"translator{index}@example.com", "password")
+            translator = Translator.objects.create(user=user, name=f"Translator {index}", experience="-", rating=5, city=riyadh)
+            translator.languages.add(arabic)
+            self.users.append(user)
+        #doesn't speak the requested language
+        other = Translator.objects.create(user=User.objects.create_user("french", "french@example.com", "password"), name="French Translator", experience="-", rating=5, city=riyadh)
+        other.languages.add(Language.objects.get(name="French"))
+
+    def create_request(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TranslationRequest.objects.create(company_name=name, company_type="private", request_type="hire", language=self.request_language, city="Riyadh")
+
+    def create_request_and_fan_out(self, name):
+        request = self.create_request(name)
+        self.assertEqual(process_fan_outs(), (1, 0))
+        return request
+
+    def test_requests_in_one_window_reach_each_translator_as_one_digest(self):
+        for name in ("Acme", "Globex", "Initech"):
+            self.create_request(name)
+        #nobody is notified until the email worker runs the queued fan-outs
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(process_fan_outs(), (3, 0))
+        self.assertFalse(RequestFanOut.objects.exists())
+
+        self.assertEqual(Notification.objects.count(), 9)
+        self.assertFalse(Notification.objects.filter(user__username="french").exists())
+
+        #still inside the digest window
+        self.assertEqual(send_digests(), 0)
+
+        later = timezone.now() + datetime.timedelta(hours=1)
+        self.assertEqual(send_digests(now=later), 3)
+        self.assertEqual(send_digests(now=later), 0)
+
+        self.assertEqual(process_outbox(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].subject, "3 new translation requests match your profile")
+        self.assertIn("Globex", mail.outbox[0].body)
+
+    def test_failed_fan_out_is_logged_and_retried(self):
+        request = self.create_request("Acme")
+        with mock.patch("notifications.digests.fan_out_request", side_effect=RuntimeError("matching down")):
+            with self.assertLogs("notifications.digests", "ERROR") as logs:
+                self.assertEqual(process_fan_outs(), (0, 1))
+        self.assertIn(f"request {request.pk} failed", logs.output[0])
+        self.assertFalse(Notification.objects.exists())
+
+        fan_out = RequestFanOut.objects.get(request=request)
+        self.assertEqual((fan_out.attempts, fan_out.last_error), (1, "RuntimeError: matching down"))
+        #not due yet, then retried
+        self.assertEqual(process_fan_outs(), (0, 0))
+        self.assertEqual(process_fan_outs(now=fan_out.next_attempt_at), (1, 0))
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_notifications_read_in_the_app_are_not_mailed(self):
+        self.create_request_and_fan_out("Acme")
+        self.client.force_login(self.users[0])
+        response = self.client.get(reverse("notifications:inbox_view"))
+        self.assertContains(response, "New request from Acme")
+
+        self.assertEqual(send_digests(now=timezone.now() + datetime.timedelta(hours=1)), 2)
@@ -0,0 +1,26 @@
+from django.shortcuts import render, redirect
+from django.http import HttpRequest
+from django.contrib import messages
+from django.utils import timezone
+
+from .models import Notification
+
+# Create your views here.
+
+INBOX_SIZE = 50
+
+
+def inbox_view(request: HttpRequest):
+
+    if not request.user.is_authenticated:
+        messages.error(request, "You must be logged in to view your notifications", "alert-danger")
+        return redirect("accounts:sign_in")
+
+    notifications = list(Notification.objects.filter(user=request.user).order_by("-created_at", "-id")[:INBOX_SIZE])
+
+    #opening the inbox marks everything shown as read (and keeps it out of the next digest email)
+    unread = [notification.pk for notification in notifications if notification.read_at is None]
+    if unread:
+        Notification.objects.filter(pk__in=unread).update(read_at=timezone.now())
+
+    return render(request, "notifications/inbox.html", {"notifications": notifications, "unread": set(unread)})
@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import LedgerRollup
 
 # Register your models here.
+class LedgerRollupAdmin(admin.ModelAdmin):
+
+    list_display = ("party_type", "party_id", "period", "period_start", "issued_count", "issued_amount", "transferred_count", "transferred_amount")
+    list_filter = ("party_type", "period")
+
+
+admin.site.register(LedgerRollup, LedgerRollupAdmin)
@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class PaymentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payment'
+
+    def ready(self):
+        #register signal handlers
+        from . import signals
+
+        from main import exports
+        from .models import Invoice
+
+        #streaming CSV / NDJSON exports (main/exports.py)
+        exports.register(
+            "invoices", Invoice,
+            [
+                ("id", "id"), ("request_id", "request_id"), ("company_name", "request__company_name"),
+                ("company_user", "request__company__username"), ("translator_id", "translator_id"),
+                ("translator_name", "translator__name"), ("amount", "amount"), ("status", "status"),
+                ("issue_date", "issue_date"), ("company_payment_date", "company_payment_date"),
+                ("transfer_confirmation_date", "transfer_confirmation_date"), ("transaction_id", "transaction_id"),
+            ],
+            date_field="issue_date", status_field="status",
+        )
@@ -0,0 +1,185 @@
+"""
+Invoice ledger rollups.
+
+Every invoice contributes to LedgerRollup rows for its translator and for
+the company that owns the request, in a day, a month and an all-time
+bucket: issued count/amount in the bucket of its issue_date and, once it
+is transferred, transferred count/amount in the bucket of its
+transfer_confirmation_date.
+
+Signals (payment/signals.py) diff an invoice's contribution before and
+after each save or delete and apply the difference with F() updates in
+the same transaction, so reading "translator X this month" is a single
+unique-index lookup. `python manage.py rebuild_ledger` recomputes
+everything from the Invoice table.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Invoice, LedgerRollup
+
+
+ALL_TIME = datetime.date(1970, 1, 1)
+METRICS = ("issued", "transferred")
+
+
+class InvoiceState(NamedTuple):
+    translator_id: int
+    company_id: int
+    amount: Decimal
+    status: str
+    issue_date: datetime.datetime
+    transfer_date: datetime.datetime
+
+
+STATE_FIELDS = ("translator_id", "request__company_id", "amount", "status", "issue_date", "transfer_confirmation_date")
+
+
+def invoice_state(pk):
+    """Current state of invoice `pk` as stored in the database, or None."""
+    row = Invoice.objects.filter(pk=pk).values_list(*STATE_FIELDS).first()
+    return InvoiceState(*row) if row else None
+
+
+def state_of(invoice):
+    company_id = invoice.request.company_id if invoice.request_id else None
+    return InvoiceState(invoice.translator_id, company_id, invoice.amount, invoice.status, invoice.issue_date, invoice.transfer_confirmation_date)
+
+
+def bucket_start(period, day):
+    if period == LedgerRollup.PeriodChoices.DAY:
+        return day
+    if period == LedgerRollup.PeriodChoices.MONTH:
+        return day.replace(day=1)
+    return ALL_TIME
+
+
+def period_starts(moment):
+    day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+    return [(period, bucket_start(period, day)) for period in LedgerRollup.PeriodChoices.values]
+
+
+def contributions(state):
+    """[(bucket key, metric, amount), ...] this invoice state adds to the ledger."""
+    if state is None:
+        return []
+    events = []
+    if state.issue_date is not None:
+        events.append(("issued", state.issue_date))
+    if state.status == Invoice.InvoiceStatus.TRANSFERRED and state.transfer_date is not None:
+        events.append(("transferred", state.transfer_date))
+
+    parties = []
+    if state.translator_id is not None:
+        parties.append((LedgerRollup.PartyChoices.TRANSLATOR, state.translator_id))
+    if state.company_id is not None:
+        parties.append((LedgerRollup.PartyChoices.COMPANY, state.company_id))
+
+    amount = Decimal(state.amount or 0)
+    return [
+        ((party_type, party_id, period, start), metric, amount)
+        for metric, moment in events
+        for party_type, party_id in parties
+        for period, start in period_starts(moment)
+    ]
+
+
+def _deltas(before, after):
+    #bucket key -> {metric: [count delta, amount delta]}
+    deltas = defaultdict(lambda: {metric: [0, Decimal(0)] for metric in METRICS})
+    for sign, state in ((-1, before), (1, after)):
+        for key, metric, amount in contributions(state):
+            deltas[key][metric][0] += sign
+            deltas[key][metric][1] += sign * amount
+    return {
+        key: metrics for key, metrics in deltas.items()
+        if any(count or amount for count, amount in metrics.values())
+    }
+
+
+def _apply(key, metrics):
+    party_type, party_id, period, start = key
+    bucket = {"party_type": party_type, "party_id": party_id, "period": period, "period_start": start}
+    changes = {}
+    for metric, (count, amount) in metrics.items():
+        changes[f"{metric}_count"] = count
+        changes[f"{metric}_amount"] = amount
+
+    if LedgerRollup.objects.filter(**bucket).update(**{field: F(field) + value for field, value in changes.items()}):
+        return
+    try:
+        with transaction.atomic():
+            LedgerRollup.objects.create(**bucket, **changes)
+    except IntegrityError:
+        #another transaction created the bucket first
+        LedgerRollup.objects.filter(**bucket).update(**{field: F(field) + value for field, value in changes.items()})
+
+
+def record_change(before, after):
+    """Move the ledger from invoice state `before` to `after` (either may be None)."""
+    for key, metrics in sorted(_deltas(before, after).items()):
+        _apply(key, metrics)
+
+
+def rollup_totals(rows):
+    """Aggregate invoice rows (STATE_FIELDS tuples) into {bucket key: LedgerRollup field values}."""
+    totals = defaultdict(lambda: {f"{metric}_{part}": 0 for metric in METRICS for part in ("count", "amount")})
+    for row in rows:
+        for key, metric, amount in contributions(InvoiceState(*row)):
+            totals[key][f"{metric}_count"] += 1
+            totals[key][f"{metric}_amount"] += amount
+    return totals
+
+
+def rebuild():
+    """Recompute every rollup from the Invoice table, returns the number of rows written."""
+    totals = rollup_totals(Invoice.objects.values_list(*STATE_FIELDS).iterator(chunk_size=2000))
+    with transaction.atomic():
+        LedgerRollup.objects.all().delete()
+        LedgerRollup.objects.bulk_create(
+            (
+                LedgerRollup(party_type=party_type, party_id=party_id, period=period, period_start=start, **values)
+                for (party_type, party_id, period, start), values in totals.items()
+            ),
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+# ---------- reading ----------
+
+class LedgerTotals(NamedTuple):
+    issued_count: int = 0
+    issued_amount: Decimal = Decimal(0)
+    transferred_count: int = 0
+    transferred_amount: Decimal = Decimal(0)
+
+
+def _totals(row):
+    return LedgerTotals(row.issued_count, row.issued_amount, row.transferred_count, row.transferred_amount) if row else LedgerTotals()
+
+
+def totals(party_type, party_id, period=LedgerRollup.PeriodChoices.ALL, day=None):
+    """Totals of one bucket, e.g. totals("translator", 3, "month") for this month."""
+    start = bucket_start(period, day or timezone.localdate())
+    row = LedgerRollup.objects.filter(party_type=party_type, party_id=party_id, period=period, period_start=start).first()
+    return _totals(row)
+
+
+def monthly(party_type, party_id, months=12):
+    """[(first day of month, LedgerTotals), ...] for the last `months` months, newest first."""
+    current = timezone.localdate().replace(day=1)
+    starts = [current]
+    for _ in range(months - 1):
+        starts.append((starts[-1] - datetime.timedelta(days=1)).replace(day=1))
+    rows = {
+        row.period_start: row
+        for row in LedgerRollup.objects.filter(party_type=party_type, party_id=party_id, period=LedgerRollup.PeriodChoices.MONTH, period_start__in=starts)
+    }
+    return [(start, _totals(rows.get(start))) for start in starts]
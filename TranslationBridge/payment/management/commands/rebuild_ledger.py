@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from payment import ledger
+
+
+class Command(BaseCommand):
+    help = "Recompute the invoice ledger rollups from the Invoice table"
+
+    def handle(self, *args, **options):
+        rows = ledger.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} ledger rollup rows"))
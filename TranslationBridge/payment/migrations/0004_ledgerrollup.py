@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:44
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+#frozen copy of payment.ledger's bucketing, migrations can't import app code that may change later
+ALL_TIME = datetime.date(1970, 1, 1)
+
+
+def _buckets(moment):
+    day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+    return [("day", day), ("month", day.replace(day=1)), ("all", ALL_TIME)]
+
+
+def backfill_ledger(apps, schema_editor):
+    Invoice = apps.get_model("payment", "Invoice")
+    LedgerRollup = apps.get_model("payment", "LedgerRollup")
+
+    totals = defaultdict(lambda: {"issued_count": 0, "issued_amount": Decimal(0), "transferred_count": 0, "transferred_amount": Decimal(0)})
+    rows = Invoice.objects.values_list("translator_id", "request__company_id", "amount", "status", "issue_date", "transfer_confirmation_date")
+    for translator_id, company_id, amount, status, issued, transferred in rows.iterator(chunk_size=2000):
+        events = []
+        if issued is not None:
+            events.append(("issued", issued))
+        if status == "transferred" and transferred is not None:
+            events.append(("transferred", transferred))
+        parties = [(party_type, party_id) for party_type, party_id in (("translator", translator_id), ("company", company_id)) if party_id is not None]
+        for metric, moment in events:
+            for party_type, party_id in parties:
+                for period, start in _buckets(moment):
+                    bucket = totals[(party_type, party_id, period, start)]
+                    bucket[f"{metric}_count"] += 1
+                    bucket[f"{metric}_amount"] += Decimal(amount or 0)
+
+    LedgerRollup.objects.bulk_create(
+        (
+            LedgerRollup(party_type=party_type, party_id=party_id, period=period, period_start=start, **values)
+            for (party_type, party_id, period, start), values in totals.items()
+        ),
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_invoice_delete_payment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party_type', models.CharField(choices=[('translator', 'Translator'), ('company', 'Company')], max_length=20)),
+                ('party_id', models.PositiveBigIntegerField()),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month'), ('all', 'All time')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('issued_count', models.IntegerField(default=0)),
+                ('issued_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transferred_count', models.IntegerField(default=0)),
+                ('transferred_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('party_type', 'party_id', 'period', 'period_start'), name='ledger_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
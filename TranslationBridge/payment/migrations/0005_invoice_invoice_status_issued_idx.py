@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_ledgerrollup'),
+        ('translation_request', '0009_translationrequest_company_translationrequest_status_and_more'),
+        ('translators', '0015_translator_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'issue_date'], name='invoice_status_issued_idx'),
+        ),
+    ]
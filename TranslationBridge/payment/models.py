@@ -39,5 +39,45 @@ class Invoice(models.Model):
     transfer_confirmation_date = models.DateTimeField(null=True, blank=True)
 
 
+    class Meta:
+        indexes = [
+            # 🎯 "pending work" queues: invoices in a status, oldest/newest first
+            models.Index(fields=["status", "issue_date"], name="invoice_status_issued_idx"),
+        ]
+
+    def __str__(self):
+        return f"Invoice #{self.pk} for Request {self.request.pk}"
+
+#Invoice totals per translator / company and per day / month (and all time), kept up to date by payment/ledger.py
+class LedgerRollup(models.Model):
+
+    class PartyChoices(models.TextChoices):
+        TRANSLATOR = 'translator', 'Translator'
+        COMPANY = 'company', 'Company'
+
+    class PeriodChoices(models.TextChoices):
+        DAY = 'day', 'Day'
+        MONTH = 'month', 'Month'
+        ALL = 'all', 'All time'
+
+    party_type = models.CharField(max_length=20, choices=PartyChoices.choices)
+    # Translator.pk or the company's User.pk
+    party_id = models.PositiveBigIntegerField()
+    period = models.CharField(max_length=10, choices=PeriodChoices.choices)
+    # first day of the day / month, 1970-01-01 for all time
+    period_start = models.DateField()
+
+    # invoices issued in the period (by issue_date)
+    issued_count = models.IntegerField(default=0)
+    issued_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # money transferred to translators in the period (by transfer_confirmation_date)
+    transferred_count = models.IntegerField(default=0)
+    transferred_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["party_type", "party_id", "period", "period_start"], name="ledger_rollup_bucket"),
+        ]
+
     def __str__(self):
-        return f"Invoice #{self.pk} for Request {self.request.pk}"
\ No newline at end of file
+        return f"{self.party_type} #{self.party_id} {self.period} {self.period_start}"
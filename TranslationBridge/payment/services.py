@@ -0,0 +1,134 @@
+"""
+Invoice pipeline.
+
+Each step runs in one transaction that first locks the row it changes
+(SELECT ... FOR UPDATE), so a double click or two companies' clicks racing
+each other are serialized: the second caller sees the first caller's
+result instead of failing on the OneToOneField or leaving a request
+assigned without an invoice.
+
+Issuing is idempotent. The invoice stores an idempotency key in
+`transaction_id` derived from (request, translator); replaying the same
+acceptance link returns the existing invoice. Emails are written to the
+outbox inside the same transaction, so the worker only ever sees them once
+the invoice is committed and a rolled back attempt sends nothing.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from main.statemachine import TransitionError
+from notifications.outbox import enqueue_email
+from translation_request.models import TranslationRequest
+from translation_request.states import request_states
+from translators.models import Translator
+
+from .models import Invoice
+from .states import invoice_states
+
+
+class InvoiceError(Exception):
+    """The requested invoice change isn't allowed, the message is shown to the user."""
+
+
+def issue_key(request_pk, translator_pk):
+    return f"issue:{request_pk}:{translator_pk}"
+
+
+def _notify_translator(translator, subject, message, dedup_key):
+    """Queue `message(user)` for the translator's user, if there is one with an email address."""
+    user = translator.user if translator is not None else None
+    if user is None or not user.email:
+        return
+    enqueue_email(subject, message(user), [user.email], from_email=settings.DEFAULT_FROM_EMAIL, dedup_key=dedup_key)
+
+
+def issue_invoice(request_pk, translator_pk, company):
+    """
+    Assign the translator to the request and issue its invoice.
+
+    Returns (invoice, created); created is False when the same acceptance
+    was already processed.
+    """
+    key = issue_key(request_pk, translator_pk)
+
+    with transaction.atomic():
+        #every concurrent issue for this request waits here until the first one commits
+        req = TranslationRequest.objects.select_for_update().get(pk=request_pk)
+        if company is None or req.company_id != company.pk:
+            raise InvoiceError("Access denied. You are not authorized to assign a translator.")
+
+        existing = Invoice.objects.filter(request=req).select_related("translator").first()
+        if existing is not None:
+            #invoices issued before idempotency keys existed have no key
+            if existing.transaction_id in (key, None) and existing.translator_id == translator_pk:
+                return existing, False
+            raise InvoiceError(f"An invoice (#{existing.pk}) has already been issued for this request to another translator.")
+
+        translator = Translator.objects.select_related("user").get(pk=translator_pk)
+
+        #the company may already have assigned this translator from the matched page
+        if not (req.status == TranslationRequest.StatusChoices.ASSIGNED and req.translator_id == translator.pk):
+            try:
+                request_states.transition(req, TranslationRequest.StatusChoices.ASSIGNED, user=company, translator=translator)
+            except TransitionError as e:
+                raise InvoiceError(str(e))
+
+        invoice = Invoice.objects.create(
+            request=req,
+            translator=translator,
+            amount=req.cost if req.cost is not None else 0,
+            status=Invoice.InvoiceStatus.ISSUED,
+            transaction_id=key,
+        )
+
+        _notify_translator(
+            translator,
+            f"New Invoice Issued for Request #{req.pk}",
+            lambda user: f"Dear {user.username},\n\nA new invoice (ID: {invoice.pk}) has been issued for the request '{req.company_name}'. Please check the platform for details and payment confirmation.\n\nThank you.",
+            f"invoice-issued:{invoice.pk}",
+        )
+    return invoice, True
+
+
+def confirm_transfer(invoice_pk, company):
+    """
+    Mark the invoice as transferred to the translator.
+
+    Returns (invoice, changed); confirming twice keeps the first
+    confirmation dates.
+    """
+    with transaction.atomic():
+        invoice = Invoice.objects.select_for_update().get(pk=invoice_pk)
+        req = TranslationRequest.objects.select_related("company").get(pk=invoice.request_id)
+        if company is None or req.company_id != company.pk:
+            raise InvoiceError("Access denied. You are not authorized to confirm this payment.")
+
+        if invoice.status == Invoice.InvoiceStatus.TRANSFERRED:
+            return invoice, False
+
+        now = timezone.now()
+        try:
+            invoice_states.transition(
+                invoice,
+                Invoice.InvoiceStatus.TRANSFERRED,
+                user=company,
+                company_payment_date=invoice.company_payment_date or now,
+                transfer_confirmation_date=now,
+            )
+        except TransitionError as e:
+            raise InvoiceError(str(e))
+
+        translator = Translator.objects.select_related("user").filter(pk=invoice.translator_id).first()
+        _notify_translator(
+            translator,
+            f"✅ Payment Transfer Confirmed for Request #{req.pk}",
+            lambda user: (
+                f"Dear {user.username},\n\n"
+                f"The company {req.company.username} confirms that the payment of {invoice.amount} has been transferred for translation request #{req.pk}.\n"
+                "Please check your bank account to verify the funds.\n\n"
+                "Thank you for using the platform."
+            ),
+            f"invoice-transferred:{invoice.pk}",
+        )
+    return invoice, True
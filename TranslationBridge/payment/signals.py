@@ -0,0 +1,35 @@
+from django.db.models.signals import pre_save, post_save, pre_delete
+from django.dispatch import receiver
+
+from main.statemachine import transitioned
+
+from .models import Invoice
+from .ledger import invoice_state, record_change, state_of
+
+
+#ledger rollups follow every invoice change in the same transaction
+@receiver(pre_save, sender=Invoice)
+def invoice_before_save(sender, instance, **kwargs):
+    instance._previous_ledger_state = invoice_state(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Invoice)
+def invoice_saved(sender, instance, **kwargs):
+    record_change(getattr(instance, "_previous_ledger_state", None), state_of(instance))
+
+
+#pre_delete: the request (and its company) still exists at this point
+@receiver(pre_delete, sender=Invoice)
+def invoice_deleted(sender, instance, **kwargs):
+    record_change(invoice_state(instance.pk), None)
+
+
+#status moves are conditional UPDATEs that skip post_save
+@receiver(transitioned, sender=Invoice)
+def invoice_transitioned(sender, instance, previous, **kwargs):
+    after = state_of(instance)
+    before = after._replace(
+        status=previous["status"],
+        transfer_date=previous.get("transfer_confirmation_date", after.transfer_date),
+    )
+    record_change(before, after)
@@ -0,0 +1,13 @@
+from main.statemachine import StateMachine
+
+from .models import Invoice
+
+
+Status = Invoice.InvoiceStatus
+
+# Allowed invoice status moves (the company may confirm the transfer straight from ISSUED)
+invoice_states = StateMachine(Invoice, {
+    Status.ISSUED: {Status.PAID, Status.TRANSFERRED},
+    Status.PAID: {Status.TRANSFERRED},
+    Status.TRANSFERRED: set(),
+})
@@ -1,3 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from notifications.models import OutboundEmail
+from translation_request.models import TranslationRequest
+from translators.models import Translator
+
+from . import ledger
+from .models import Invoice, LedgerRollup
+from .services import InvoiceError, confirm_transfer, issue_invoice
 
 # Create your tests here.
+
+
+class IssueInvoiceTest(TestCase):
+
+    def setUp(self):
+        self.company = User.objects.create_user("company", "company@example.com", "password")
+        self.request = TranslationRequest.objects.create(company=self.company, company_name="Acme", company_type="private", request_type="hire", cost=500)
+        self.translators = [
+            Translator.objects.create(user=User.objects.create_user(f"translator{i}", f"translator{i}@example.com", "password"), name=f"Translator {i}", experience="-")
+            for i in range(2)
+        ]
+        self.url = reverse("payment:issue_invoice_and_assign", args=[self.request.pk, self.translators[0].pk])
+
+    def test_repeated_clicks_issue_one_invoice_and_one_email(self):
+        self.client.force_login(self.company)
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        invoice = Invoice.objects.get()
+        self.assertRedirects(first, reverse("payment:invoice_detail", args=[invoice.pk]), fetch_redirect_response=False)
+        self.assertRedirects(second, reverse("payment:invoice_detail", args=[invoice.pk]), fetch_redirect_response=False)
+        self.assertEqual(invoice.transaction_id, f"issue:{self.request.pk}:{self.translators[0].pk}")
+        self.assertEqual(invoice.amount, 500)
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.translator, self.request.status), (self.translators[0], TranslationRequest.StatusChoices.ASSIGNED))
+        self.assertEqual(OutboundEmail.objects.filter(dedup_key=f"invoice-issued:{invoice.pk}").count(), 1)
+
+    def test_second_translator_cannot_take_an_invoiced_request(self):
+        issue_invoice(self.request.pk, self.translators[0].pk, self.company)
+        with self.assertRaises(InvoiceError):
+            issue_invoice(self.request.pk, self.translators[1].pk, self.company)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.translator, self.translators[0])
+
+    def test_company_can_pick_another_translator_before_invoicing(self):
+        self.client.force_login(self.company)
+        self.client.get(reverse("translation_request:assign_translator", args=[self.request.pk, self.translators[0].pk]))
+
+        invoice, created = issue_invoice(self.request.pk, self.translators[1].pk, self.company)
+        self.assertTrue(created)
+        self.assertEqual(invoice.translator, self.translators[1])
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.translator, self.request.status), (self.translators[1], TranslationRequest.StatusChoices.ASSIGNED))
+
+    def test_only_the_requesting_company_can_issue(self):
+        other = User.objects.create_user("other", "other@example.com", "password")
+        with self.assertRaises(InvoiceError):
+            issue_invoice(self.request.pk, self.translators[0].pk, other)
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_failure_rolls_back_assignment_and_email(self):
+        with mock.patch.object(Invoice.objects, "create", side_effect=RuntimeError("boom")), self.assertRaises(RuntimeError):
+            issue_invoice(self.request.pk, self.translators[0].pk, self.company)
+
+        self.request.refresh_from_db()
+        self.assertIsNone(self.request.translator)
+        self.assertEqual(self.request.status, TranslationRequest.StatusChoices.PENDING)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class LedgerTest(TestCase):
+
+    def setUp(self):
+        self.company = User.objects.create_user("company", "company@example.com", "password")
+        self.translator = Translator.objects.create(user=User.objects.create_user("translator", "translator@example.com", "password"), name="Translator", experience="-")
+        self.requests = [
+            TranslationRequest.objects.create(company=self.company, company_name=f"Acme {i}", company_type="private", request_type="hire", cost=100 * (i + 1))
+            for i in range(3)
+        ]
+
+    def rollups(self):
+        return sorted(LedgerRollup.objects.values_list("party_type", "party_id", "period", "period_start", "issued_count", "issued_amount", "transferred_count", "transferred_amount"))
+
+    def test_rollups_follow_issue_and_transfer(self):
+        for req in self.requests:
+            issue_invoice(req.pk, self.translator.pk, self.company)
+        confirm_transfer(Invoice.objects.get(request=self.requests[0]).pk, self.company)
+        #confirming again changes nothing
+        confirm_transfer(Invoice.objects.get(request=self.requests[0]).pk, self.company)
+
+        month = ledger.totals("translator", self.translator.pk, "month")
+        self.assertEqual((month.issued_count, month.issued_amount), (3, 600))
+        self.assertEqual((month.transferred_count, month.transferred_amount), (1, 100))
+        company = ledger.totals("company", self.company.pk)
+        self.assertEqual((company.issued_count, company.transferred_amount), (3, 100))
+
+        with self.assertNumQueries(1):
+            ledger.totals("translator", self.translator.pk, "day")
+
+        Invoice.objects.get(request=self.requests[2]).delete()
+        self.assertEqual(ledger.totals("translator", self.translator.pk).issued_amount, 300)
+
+        incremental = self.rollups()
+        ledger.rebuild()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_dashboard_reads_the_translators_rollups(self):
+        issue_invoice(self.requests[1].pk, self.translator.pk, self.company)
+        self.client.force_login(self.translator.user)
+        response = self.client.get(reverse("payment:ledger"))
+        self.assertEqual(response.context["this_month"].issued_amount, 200)
+        self.assertEqual(len(response.context["months"]), 12)
@@ -1,11 +1,10 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpRequest
-from django.core.mail import send_mail
-from django.conf import settings
-from django.utils import timezone  # Used for confirmation timestamps
+from django.http import HttpRequest, Http404
 from translation_request.models import TranslationRequest
 from translators.models import Translator
 from .models import Invoice  # Assumes you modified the model to 'Invoice'
+from .services import InvoiceError, issue_invoice, confirm_transfer
+from . import ledger
 from django.contrib.auth.models import User
 from django.contrib import messages
 
@@ -42,48 +41,23 @@ def payment_page(request: HttpRequest, request_id: int):
 # -------------------------------------------------------------
 
 def issue_invoice_and_assign_translator(request: HttpRequest, request_pk: int, translator_pk: int):
-    # 1. Fetch objects
-    req = get_object_or_404(TranslationRequest, pk=request_pk)
-    translator_obj = get_object_or_404(Translator, pk=translator_pk)
-
-    # 2. Authorization Check: Only the request owner (Company) can assign
-    if request.user != req.company:
-        messages.error(request, "Access denied. You are not authorized to assign a translator.", "alert-danger")
+    # 1. Assign the translator and issue the invoice in one locked transaction (see payment/services.py)
+    try:
+        invoice, created = issue_invoice(request_pk, translator_pk, request.user if request.user.is_authenticated else None)
+    except (TranslationRequest.DoesNotExist, Translator.DoesNotExist):
+        raise Http404("Request or translator not found.")
+    except InvoiceError as e:
+        # 🎯 Error Message
+        messages.error(request, str(e), "alert-danger")
         return redirect('translation_request:request_detail_view', pk=request_pk)
 
-    # 3. Update Request Status and Assign Translator
-    req.translator = translator_obj
-    req.status = TranslationRequest.StatusChoices.ASSIGNED
-    req.save()
-
-    # 4. Create the Invoice
-    try:
-        # Use req.cost as the invoice amount, default to 0 if None
-        amount_to_charge = req.cost if req.cost is not None else 0 
-        
-        invoice = Invoice.objects.create(
-            request=req,
-            translator=translator_obj,
-            amount=amount_to_charge,
-            status=Invoice.InvoiceStatus.ISSUED # Status: Issued
-        )
-        
-        # 🎯 Success Message
+    # 🎯 Success Message (the link was already used: just show the invoice again)
+    if created:
         messages.success(request, f"Translator assigned and Invoice #{invoice.pk} issued successfully.", "alert-success")
-        
-        # 5. Send Email Notification to the Translator (Invoice Issued)
-        send_mail(
-            f"New Invoice Issued for Request #{req.pk}",
-            f"Dear {translator_obj.user.username},\n\nA new invoice (ID: {invoice.pk}) has been issued for the request '{req.company_name}'. Please check the platform for details and payment confirmation.\n\nThank you.",
-            settings.DEFAULT_FROM_EMAIL,
-            [translator_obj.user.email]
-        )
-
-    except Exception as e:
-        # 🎯 Error Message
-        messages.error(request, f"An error occurred while issuing the invoice or sending the email: {e}", "alert-danger")
+    else:
+        messages.info(request, f"Invoice #{invoice.pk} was already issued for this request.", "alert-info")
 
-    # 6. Redirect to the Invoice Details Page
+    # 2. Redirect to the Invoice Details Page
     return redirect('payment:invoice_detail', pk=invoice.pk)
 
 
@@ -114,38 +88,46 @@ def invoice_detail_view(request: HttpRequest, pk: int):
 # -------------------------------------------------------------
 
 def confirm_transfer_to_translator(request: HttpRequest, invoice_pk: int):
-    invoice = get_object_or_404(Invoice, pk=invoice_pk)
-    
-    # 1. Authorization Check: Only the Request Company can confirm transfer
-    if request.user != invoice.request.company:
+    # 1. Lock the invoice, check the company and mark it transferred (see payment/services.py)
+    try:
+        invoice, changed = confirm_transfer(invoice_pk, request.user if request.user.is_authenticated else None)
+    except Invoice.DoesNotExist:
+        raise Http404("Invoice not found.")
+    except InvoiceError as e:
         # 🎯 Error Message
-        messages.error(request, "Access denied. You are not authorized to confirm this payment.", "alert-danger")
+        messages.error(request, str(e), "alert-danger")
         return redirect('payment:invoice_detail', pk=invoice_pk)
 
-    # 2. Update Invoice Status and Confirmation Dates
-    invoice.status = Invoice.InvoiceStatus.TRANSFERRED # Status: Transferred to Translator
-    invoice.company_payment_date = timezone.now()
-    invoice.transfer_confirmation_date = timezone.now()
-    invoice.save()
+    # 🎯 Success Message
+    if changed:
+        messages.success(request, "Payment transfer confirmed, the translator will be notified by email.", "alert-success")
+    else:
+        messages.info(request, "This payment transfer was already confirmed.", "alert-info")
+
+    return redirect('payment:invoice_detail', pk=invoice_pk)
 
-    # 3. Send Final Email Notification to the Translator (Payment Confirmed)
-    translator_email = invoice.translator.user.email
-    
-    subject = f"✅ Payment Transfer Confirmed for Request #{invoice.request.pk}"
-    # 🎯 Email Content in English
-    message = (
-        f"Dear {invoice.translator.user.username},\n\n"
-        f"The company {invoice.request.company.username} confirms that the payment of {invoice.amount} has been transferred for translation request #{invoice.request.pk}.\n"
-        "Please check your bank account to verify the funds.\n\n"
-        "Thank you for using the platform."
-    )
 
-    try:
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [translator_email])
-        # 🎯 Success Message
-        messages.success(request, "Payment transfer confirmed and email successfully sent to the translator.", "alert-success")
-    except Exception as e:
-        # 🎯 Error Message
-        messages.error(request, "Payment confirmed, but failed to send notification email to the translator.", "alert-danger")
 
-    return redirect('payment:invoice_detail', pk=invoice_pk)
\ No newline at end of file
+# -------------------------------------------------------------
+# 5. Ledger Dashboard (Totals for the logged-in Translator or Company)
+# -------------------------------------------------------------
+
+def ledger_view(request: HttpRequest):
+    if not request.user.is_authenticated:
+        messages.error(request, "You must be logged in to view your ledger.", "alert-danger")
+        return redirect('accounts:sign_in')
+
+    # 1. Translators see what they received, companies what they paid (read from the rollups, no invoice scan)
+    translator = Translator.objects.filter(user=request.user).only("pk").first()
+    if translator is not None:
+        party_type, party_id = ledger.LedgerRollup.PartyChoices.TRANSLATOR, translator.pk
+    else:
+        party_type, party_id = ledger.LedgerRollup.PartyChoices.COMPANY, request.user.pk
+
+    return render(request, "payment/ledger.html", {
+        "party_type": party_type,
+        "today": ledger.totals(party_type, party_id, ledger.LedgerRollup.PeriodChoices.DAY),
+        "this_month": ledger.totals(party_type, party_id, ledger.LedgerRollup.PeriodChoices.MONTH),
+        "all_time": ledger.totals(party_type, party_id),
+        "months": ledger.monthly(party_type, party_id),
+    })
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import TranslationRequest
+from main import search
 # Register your models here.
 
 @admin.register(TranslationRequest)
@@ -18,6 +19,13 @@ class TranslationRequestAdmin(admin.ModelAdmin):
     search_fields = ("company_name", "description")
     
     readonly_fields = ("created_at",)
+
+    #use the full-text index instead of icontains scans over description
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        ids = [pk for pk, _ in search.search(TranslationRequest, search_term, limit=500)]
+        return queryset.filter(pk__in=ids), False
     
     fieldsets = (
         ("Basic Info", {
@@ -4,3 +4,32 @@ from django.apps import AppConfig
 class TranslationRequestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'translation_request'
+
+    def ready(self):
+        from main import exports, queryplans, search, storage
+        from .models import TranslationRequest
+
+        #models covered by the full-text search index
+        search.register(TranslationRequest, {"company_name": 2.0, "description": 1.0})
+
+        #file fields whose blobs are reference-counted by collect_media_blobs (main/storage.py)
+        storage.register(TranslationRequest, "file")
+
+        #hot queries checked by `manage.py audit_query_plans` (main/queryplans.py)
+        queryplans.register("request list", lambda: TranslationRequest.objects.order_by("-created_at", "-id")[:13])
+        queryplans.register("request list by type", lambda: TranslationRequest.objects.filter(request_type="hire").order_by("-created_at", "-id")[:13])
+        queryplans.register("pending requests", lambda: TranslationRequest.objects.filter(status="pending").order_by("-created_at")[:50])
+        queryplans.register("related requests", lambda: TranslationRequest.objects.filter(location="Riyadh").exclude(pk=0)[:3])
+
+        #streaming CSV / NDJSON exports (main/exports.py)
+        exports.register(
+            "requests", TranslationRequest,
+            [
+                ("id", "id"), ("company_name", "company_name"), ("company_user", "company__username"),
+                ("company_type", "company_type"), ("request_type", "request_type"), ("status", "status"),
+                ("language", "language__name"), ("specialty", "specialty"), ("city", "city"),
+                ("location", "location"), ("cost", "cost"), ("duration_days", "duration_days"),
+                ("start_date", "start_date"), ("translator_name", "translator__name"), ("created_at", "created_at"),
+            ],
+            date_field="created_at", status_field="status",
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0012_alter_country_flag'),
+        ('translation_request', '0009_translationrequest_company_translationrequest_status_and_more'),
+        ('translators', '0015_translator_review_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='translationrequest',
+            index=models.Index(fields=['status', '-created_at'], name='request_status_created_idx'),
+        ),
+    ]
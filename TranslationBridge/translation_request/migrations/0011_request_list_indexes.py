@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0012_alter_country_flag'),
+        ('translation_request', '0010_translationrequest_request_status_created_idx'),
+        ('translators', '0016_name_upper_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='translationrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translationrequest',
+            index=models.Index(fields=['request_type', '-created_at', '-id'], name='request_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translationrequest',
+            index=models.Index(fields=['location'], name='request_location_idx'),
+        ),
+    ]
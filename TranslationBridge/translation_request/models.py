@@ -49,6 +49,17 @@ class TranslationRequest(models.Model):
     # -------- حالة الطلب --------
     status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.PENDING)
 
+    class Meta:
+        indexes = [
+            # قوائم "الطلبات المعلقة" مرتبة بالأحدث
+            models.Index(fields=["status", "-created_at"], name="request_status_created_idx"),
+            # request_list_view: ترقيم بالمؤشر (created_at, id) مع وبدون فلتر النوع
+            models.Index(fields=["-created_at", "-id"], name="request_created_idx"),
+            models.Index(fields=["request_type", "-created_at", "-id"], name="request_type_created_idx"),
+            # request_detail_view: طلبات مشابهة في نفس الموقع
+            models.Index(fields=["location"], name="request_location_idx"),
+        ]
+
     def __str__(self):
         return f"{self.company_name} - {self.request_type} - {self.status}"
     
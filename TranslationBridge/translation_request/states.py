@@ -0,0 +1,15 @@
+from main.statemachine import StateMachine
+
+from .models import TranslationRequest
+
+
+Status = TranslationRequest.StatusChoices
+
+# الانتقالات المسموحة لحالة الطلب
+request_states = StateMachine(TranslationRequest, {
+    Status.PENDING: {Status.ASSIGNED, Status.REJECTED},
+    # assigned -> assigned: الشركة تختار مترجماً آخر (إعادة التعيين)
+    Status.ASSIGNED: {Status.ASSIGNED, Status.ACCEPTED, Status.REJECTED, Status.PENDING},
+    Status.REJECTED: {Status.PENDING},
+    Status.ACCEPTED: set(),
+})
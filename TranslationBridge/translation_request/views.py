@@ -3,26 +3,32 @@ from django.http import HttpResponse, HttpRequest
 
 #for sending email message
 from django.conf import settings
-from django.core.mail import EmailMessage, send_mail
 from django.template.loader import render_to_string
+from notifications.outbox import enqueue_email
 
 from .forms import TranslationRequestForm
 from companies.models import Language, City 
-from translators.models import specialty, Translator, City, Language
+from translators.models import Translator
+from translators.matching import matching_index
+from translators.reference import reference_data
 from django.contrib import messages
 
 from companies.models import Company
 
 from .models import TranslationRequest
+from .states import request_states
+from main.statemachine import TransitionError
 
 from django.urls import reverse 
 
+from main.pagination import KeysetPaginator
+
 
 # Create your views here.
 
 def request_create_view(request: HttpRequest):
     
-    languages = Language.objects.all()
+    languages = reference_data().languages
     if request.method == "POST":
         form = TranslationRequestForm(request.POST, request.FILES)
         if form.is_valid():
@@ -51,7 +57,11 @@ def request_list_view(request: HttpRequest):
       messages.error(request, "You must be logged in to view this list", "alert-danger")
       return redirect("accounts:sign_in")
 
-    return render(request, "translation_request/request_list.html", {"requests": requests})
+    # ترقيم الصفحات بالمؤشر (created_at, id)
+    paginator = KeysetPaginator(requests, ordering=("-created_at", "-id"), per_page=12, with_count=True)
+    requests_page = paginator.get_page(request.GET)
+
+    return render(request, "translation_request/request_list.html", {"requests": requests_page})
    
 
 def request_detail_view(request: HttpRequest, pk: int):
@@ -97,35 +107,20 @@ def request_matched_view(request: HttpRequest, request_id: int):
 
     translation_request = TranslationRequest.objects.get(pk=request_id)
 
-    # البحث عن المدينة
-    city_obj = None
-    if translation_request.city:
-        city_obj = City.objects.filter(name__iexact=translation_request.city).first()
-
-    # البحث عن اللغة
-    language_obj = None
-    if translation_request.language:
-        if isinstance(translation_request.language, Language):
-            language_obj = translation_request.language
-        else:
-            language_obj = Language.objects.filter(name__iexact=str(translation_request.language)).first()
-
-    # البحث عن التخصص
-    specialty_obj = None
-    if translation_request.specialty:
-        specialty_obj = specialty.objects.filter(name__iexact=translation_request.specialty).first()
-
-    # فلترة المترجمين
-    matched_translators = Translator.objects.all()
-    # فلترة فقط إذا كانت القيم كائنات نموذج صحيحة
-    if city_obj is not None and isinstance(city_obj, City):
-        matched_translators = matched_translators.filter(city=city_obj)
-    if language_obj is not None and isinstance(language_obj, Language):
-        matched_translators = matched_translators.filter(languages=language_obj)
-    if specialty_obj is not None and isinstance(specialty_obj, specialty):
-        matched_translators = matched_translators.filter(specialties=specialty_obj)
+    # ترتيب المترجمين حسب درجة المطابقة (مطابقة جزئية بدلاً من الفلترة الصارمة)
+    ranked = matching_index.rank(
+        city=translation_request.city,
+        language=translation_request.language,
+        specialty=translation_request.specialty,
+    )
 
-    matched_translators = matched_translators.distinct()
+    scores = dict(ranked)
+    matched_translators = sorted(
+        Translator.objects.filter(pk__in=scores).select_related("city").prefetch_related("languages"),
+        key=lambda translator: -scores[translator.pk],
+    )
+    for translator in matched_translators:
+        translator.match_score = scores[translator.pk]
 
     return render(request, "translation_request/request_matched.html", {
         "translation_request": translation_request,
@@ -137,10 +132,15 @@ def assign_translator(request, request_id, translator_id):
     translation_request = get_object_or_404(TranslationRequest, id=request_id)
     translator = get_object_or_404(Translator, id=translator_id)
 
-    # تعيين المترجم للطلب وتغيير الحالة
-    translation_request.translator = translator
-    translation_request.status = TranslationRequest.StatusChoices.ASSIGNED
-    translation_request.save()
+    # تعيين المترجم للطلب وتغيير الحالة (تحديث مشروط بالحالة الحالية)
+    if translation_request.status == TranslationRequest.StatusChoices.ASSIGNED and translation_request.translator_id == translator.pk:
+        messages.info(request, "This translator is already assigned to the request.", "alert-info")
+        return redirect('translation_request:request_list_view')
+    try:
+        request_states.transition(translation_request, TranslationRequest.StatusChoices.ASSIGNED, user=request.user, translator=translator)
+    except TransitionError as e:
+        messages.error(request, str(e), "alert-danger")
+        return redirect('translation_request:request_list_view')
     messages.success(request, "Translator assigned successfully!", "alert-success")
     return redirect('translation_request:request_list_view')
 
@@ -182,17 +182,14 @@ def request_accept_view(request: HttpRequest, pk: int):
         "The Platform Team"
     )
     
-    # 4. إرسال الإيميل
-    try:
-        send_mail(
-            subject, 
-            message, 
-            settings.DEFAULT_FROM_EMAIL, 
-            [company_email],
-            fail_silently=False
-        )
-        messages.success(request, "Your interest has been successfully sent to the company! They will contact you soon.", "alert-success")
-    except Exception as e:
-        messages.error(request, f"Error sending the email to the company: {e}", "alert-danger")
+    # 4. إضافة الإيميل إلى قائمة الإرسال (يرسله عامل البريد)
+    enqueue_email(
+        subject,
+        message,
+        [company_email],
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        dedup_key=f"request-interest:{translation_request.pk}:{translator_obj.pk}",
+    )
+    messages.success(request, "Your interest has been successfully sent to the company! They will contact you soon.", "alert-success")
         
     return redirect('translation_request:request_detail_view', pk=pk)
\ No newline at end of file
@@ -4,8 +4,9 @@ from .models import Language, Country, City, Translator, Review, specialty
 # Register your models here.
 class TranslatorAdmin(admin.ModelAdmin):
 
-    list_display = ( "name","image","rating")
+    list_display = ( "name","image","rating", "review_count", "review_average")
     list_filter= ("rating",)
+    readonly_fields = ("review_count", "review_sum", "review_average", "review_star1", "review_star2", "review_star3", "review_star4", "review_star5")
 
 class ReviewAdmin (admin.ModelAdmin):
 
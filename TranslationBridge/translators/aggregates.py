@@ -0,0 +1,59 @@
+"""
+Denormalized review statistics on Translator.
+
+Inserts and deletes adjust the counters with a single conditional UPDATE
+(F expressions, no read-modify-write) inside the caller's transaction;
+edits that change a review's rating or translator recompute the row from
+the Review table.
+"""
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import Translator, Review
+
+
+def star_bucket(rating):
+    """Clamp a review rating into the 1..5 histogram buckets."""
+    try:
+        return min(max(int(rating), 1), 5)
+    except (TypeError, ValueError):
+        return 1
+
+
+def apply_review(translator_id, rating, sign=1):
+    """Add (sign=1) or remove (sign=-1) one review from the aggregates."""
+    rating = int(rating)
+    star_field = f"review_star{star_bucket(rating)}"
+    count = F("review_count") + sign
+    total = F("review_sum") + sign * rating
+
+    #both sides of the SET read the old column values, so this is the new average
+    average = Cast(total, FloatField()) / Cast(count, FloatField())
+    if sign < 0:
+        #removing the last review would divide by zero
+        average = Case(When(review_count__lte=1, then=Value(0.0)), default=average, output_field=FloatField())
+
+    Translator.objects.filter(pk=translator_id).update(
+        review_count=count,
+        review_sum=total,
+        review_average=average,
+        **{star_field: F(star_field) + sign},
+    )
+
+
+def recompute_review_stats(translator_id):
+    """Rebuild one translator's aggregates from its Review rows."""
+    stats = Review.objects.filter(translator_id=translator_id).aggregate(
+        count=Count("id"),
+        total=Sum("rating"),
+        average=Avg("rating"),
+        **{f"star{stars}": Count("id", filter=Q(rating=stars)) for stars in range(2, 5)},
+        star1=Count("id", filter=Q(rating__lte=1)),
+        star5=Count("id", filter=Q(rating__gte=5)),
+    )
+    Translator.objects.filter(pk=translator_id).update(
+        review_count=stats["count"],
+        review_sum=stats["total"] or 0,
+        review_average=stats["average"] or 0,
+        **{f"review_star{stars}": stats[f"star{stars}"] for stars in range(1, 6)},
+    )
@@ -4,3 +4,44 @@ from django.apps import AppConfig
 class TranslatorsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'translators'
+
+    def ready(self):
+        #register signal handlers
+        from . import signals
+
+        from main import images, queryplans, search, storage
+        from main.cache import depends_on, invalidate_on
+        from . import matching
+        from .models import City, Country, Language, Review, Translator, specialty
+
+        #models covered by the full-text search index
+        search.register(Translator, {"name": 2.0, "experience": 1.0})
+
+        #resized WebP/JPEG copies for the {% responsive_image %} tag (main/images.py)
+        images.register(Translator, "image")
+        images.register(Country, "flag")
+
+        #file fields whose blobs are reference-counted by collect_media_blobs (main/storage.py)
+        storage.register(Translator, "image")
+        storage.register(Country, "flag")
+
+        #hot queries checked by `manage.py audit_query_plans` (main/queryplans.py)
+        queryplans.register("home best translators", lambda: Translator.objects.filter(rating__gte=1).order_by("-rating")[:3])
+        #SQLite runs iexact as LIKE, which can't use an index
+        queryplans.register("city by name", lambda: City.objects.filter(name__iexact="riyadh"), vendors=("postgresql",))
+        queryplans.register("language by name", lambda: Language.objects.filter(name__iexact="arabic"), vendors=("postgresql",))
+        queryplans.register("specialty by name", lambda: specialty.objects.filter(name__iexact="legal"), vendors=("postgresql",))
+
+        #cached pages are invalidated when the models they show change
+        invalidate_on(
+            "translators",
+            Translator, Review, Language, City, Country, specialty,
+            m2m=(Translator.languages.through, Translator.specialties.through),
+        )
+        invalidate_on("reference", Language, City, Country, specialty)
+        #the matching index follows its own signals (signals.py), bulk writes bump it by group
+        depends_on(
+            matching.GROUP,
+            Translator, Review, Language, City, Country, specialty,
+            Translator.languages.through, Translator.specialties.through,
+        )
@@ -1,8 +1,40 @@
 from django import forms
-from translators.models import Translator
+from translators.models import Translator, Review
 
 #Create the form class
 class TranslatorForm(forms.ModelForm):
     class Meta:
         model = Translator
         fields = ["name", "image","specialties", "experience", "city", "languages"]
+
+
+#Review form, the rating is stored in a SmallIntegerField and counted in the 1..5 star aggregates
+class ReviewForm(forms.ModelForm):
+
+    rating = forms.IntegerField(min_value=1, max_value=5, required=False)
+    comment = forms.CharField(required=False)
+
+    class Meta:
+        model = Review
+        fields = ["rating", "comment"]
+
+    #reviews posted without a rating have always counted as 5 stars
+    def clean_rating(self):
+        rating = self.cleaned_data["rating"]
+        return 5 if rating is None else rating
+
+
+
+#Translators list search filters (plain ids, so validating doesn't hit the database)
+class TranslatorSearchForm(forms.Form):
+
+    SORT_CHOICES = [
+        ("rating", "Top rated"),
+        ("recent", "Most recent"),
+    ]
+
+    language = forms.IntegerField(required=False, min_value=1)
+    city = forms.IntegerField(required=False, min_value=1)
+    specialty = forms.IntegerField(required=False, min_value=1)
+    min_rating = forms.IntegerField(required=False, min_value=1, max_value=5)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
@@ -0,0 +1,312 @@
+"""
+In-memory matching index for translators.
+
+Every translator is stored under each (city, language, specialty) key it
+satisfies, including the wildcard (None) variants, so a lookup for any
+combination of request criteria is a single dict access. Buckets are kept
+sorted by (-rating, id) which gives the ranking for free.
+
+The same rows double as a feature matrix for `rank()`, which scores
+translators against a request with configurable weights so partial matches
+are returned instead of an empty page. It walks the buckets a translator
+can score from, best first, and stops each walk once no later row could
+make the top k.
+
+The index is loaded lazily and updated incrementally from model signals.
+Every change bumps the "matching" group version in main/cache.py's shared
+version store, so other worker processes reload their copy within
+VERSION_CHECK_SECONDS.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import NamedTuple
+
+from django.conf import settings
+
+from main.cache import bump, group_versions
+
+from .models import City, Language, Translator, specialty
+
+
+GROUP = "matching"
+
+#weights used by rank(), can be overridden with settings.TRANSLATOR_MATCH_WEIGHTS
+DEFAULT_WEIGHTS = {
+    "city": 3.0,        #same city as the request
+    "country": 1.5,     #different city in the same country
+    "language": 4.0,
+    "specialty": 2.0,
+    "rating": 1.0,      #Translator.rating scaled to 0..1
+    "reviews": 1.0,     #average review rating scaled to 0..1
+}
+DEFAULT_TOP_K = 12
+#highest Translator.review_average, bounds the score of rows rank() hasn't read yet
+MAX_REVIEW_AVERAGE = 5
+
+
+def fold(value):
+    """Case-fold a lookup name the same way the index stores it."""
+    if value is None:
+        return None
+    value = str(value).strip().casefold()
+    return value or None
+
+
+class TranslatorFeatures(NamedTuple):
+    rating: int
+    city: str
+    country: str
+    languages: frozenset
+    specialties: frozenset
+    review_average: float
+
+
+class MatchingIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+        #(city, language, specialty) -> sorted list of (-rating, id)
+        self._buckets = {}
+        #translator id -> TranslatorFeatures
+        self._rows = {}
+        self._city_countries = {}
+        self._country_cities = {}
+        self._cities = set()
+        self._languages = set()
+        self._specialties = set()
+
+    # ---------- loading ----------
+
+    def _ensure_loaded(self):
+        version = group_versions([GROUP])[0]
+        if self._loaded and version == self._version:
+            return
+        with self._lock:
+            if not (self._loaded and version == self._version):
+                self._load(version)
+
+    def _load(self, version):
+        translators = Translator.objects.values_list("id", "rating", "city__name", "city__country__name", "review_average")
+
+        languages = {}
+        for translator_id, name in Translator.languages.through.objects.values_list("translator_id", "language__name"):
+            languages.setdefault(translator_id, set()).add(fold(name))
+
+        specialties = {}
+        for translator_id, name in Translator.specialties.through.objects.values_list("translator_id", "specialty__name"):
+            specialties.setdefault(translator_id, set()).add(fold(name))
+
+        #one sort per bucket, insort() per row would be quadratic in the wide buckets
+        rows, buckets = {}, {}
+        for pk, rating, city, country, review_average in translators:
+            row = TranslatorFeatures(
+                rating=rating,
+                city=fold(city),
+                country=fold(country),
+                languages=frozenset(languages.get(pk, ())),
+                specialties=frozenset(specialties.get(pk, ())),
+                review_average=review_average,
+            )
+            rows[pk] = row
+            for key in self._keys(row):
+                buckets.setdefault(key, []).append((-rating, pk))
+        for bucket in buckets.values():
+            bucket.sort()
+
+        city_countries = {fold(name): fold(country) for name, country in City.objects.values_list("name", "country__name")}
+        language_names = {fold(name) for name in Language.objects.values_list("name", flat=True)}
+        specialty_names = {fold(name) for name in specialty.objects.values_list("name", flat=True)}
+
+        #readers take the lock too, but swap whole structures so none of them sees half a load
+        self._rows, self._buckets = rows, buckets
+        self._city_countries, self._cities = city_countries, set(city_countries)
+        self._country_cities = {}
+        for name, country in city_countries.items():
+            self._country_cities.setdefault(country, set()).add(name)
+        self._languages, self._specialties = language_names, specialty_names
+        self._version = version
+        self._loaded = True
+
+    def _publish(self):
+        """Tell every process the data changed; keep this copy only if nobody else changed it meanwhile."""
+        version = bump(GROUP)[0]
+        if self._loaded and self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            self._loaded = False
+
+    # ---------- bucket maintenance ----------
+
+    @staticmethod
+    def _keys(row):
+        for city_key in {row.city, None}:
+            for language_key in row.languages | {None}:
+                for specialty_key in row.specialties | {None}:
+                    yield (city_key, language_key, specialty_key)
+
+    def _insert(self, pk, row):
+        #incremental updates only, _load() sorts each bucket once
+        entry = (-row.rating, pk)
+        for key in self._keys(row):
+            insort(self._buckets.setdefault(key, []), entry)
+        self._rows[pk] = row
+
+    def _discard(self, pk):
+        row = self._rows.pop(pk, None)
+        if row is None:
+            return
+        entry = (-row.rating, pk)
+        for key in self._keys(row):
+            bucket = self._buckets.get(key)
+            if not bucket:
+                continue
+            position = bisect_left(bucket, entry)
+            if position < len(bucket) and bucket[position] == entry:
+                del bucket[position]
+            if not bucket:
+                del self._buckets[key]
+
+    # ---------- incremental updates ----------
+
+    def refresh_translator(self, pk):
+        """Reload a single translator row after it (or its M2M sets) changed."""
+        with self._lock:
+            if not self._loaded:
+                self._publish()
+                return
+            translator = Translator.objects.filter(pk=pk).values_list("rating", "city__name", "city__country__name", "review_average").first()
+            self._discard(pk)
+            if translator is not None:
+                rating, city, country, review_average = translator
+                self._insert(pk, TranslatorFeatures(
+                    rating=rating,
+                    city=fold(city),
+                    country=fold(country),
+                    languages=frozenset(fold(name) for name in Translator.languages.through.objects.filter(translator_id=pk).values_list("language__name", flat=True)),
+                    specialties=frozenset(fold(name) for name in Translator.specialties.through.objects.filter(translator_id=pk).values_list("specialty__name", flat=True)),
+                    review_average=review_average,
+                ))
+            self._publish()
+
+    def remove_translator(self, pk):
+        with self._lock:
+            if self._loaded:
+                self._discard(pk)
+            self._publish()
+
+    def invalidate(self):
+        """Drop the whole index, e.g. after a city, language or specialty changed."""
+        with self._lock:
+            self._loaded = False
+            self._rows = {}
+            self._buckets = {}
+            bump(GROUP)
+
+    # ---------- lookups ----------
+
+    def match(self, city=None, language=None, specialty=None, limit=None):
+        """
+        Return ranked translator ids matching the given names.
+
+        A criterion whose name is unknown (no such city, language or
+        specialty) is ignored, the same way the old view skipped filters
+        it could not resolve.
+        """
+        self._ensure_loaded()
+
+        city = fold(city)
+        language = fold(language)
+        specialty = fold(specialty)
+        with self._lock:
+            key = (
+                city if city in self._cities else None,
+                language if language in self._languages else None,
+                specialty if specialty in self._specialties else None,
+            )
+            bucket = self._buckets.get(key, [])
+            return [pk for _, pk in bucket[:limit]]
+
+    def rank(self, city=None, language=None, specialty=None, k=None, weights=None):
+        """
+        Score translators against the request and return the best `k` as a
+        list of (translator_id, score), highest score first.
+
+        Unlike `match()` nothing is filtered out: a translator in the same
+        country who speaks the language still ranks, just below exact
+        matches.
+        """
+        self._ensure_loaded()
+
+        if k is None:
+            k = getattr(settings, "TRANSLATOR_MATCH_TOP_K", DEFAULT_TOP_K)
+        weights = {**DEFAULT_WEIGHTS, **getattr(settings, "TRANSLATOR_MATCH_WEIGHTS", {}), **(weights or {})}
+        if k <= 0:
+            return []
+
+        city = fold(city)
+        language = fold(language)
+        specialty = fold(specialty)
+
+        rating_weight = weights["rating"] / 5
+        reviews_weight = weights["reviews"] / 5
+
+        def score(row):
+            value = row.rating * rating_weight + row.review_average * reviews_weight
+            if city is not None and row.city == city:
+                value += weights["city"]
+            elif country is not None and row.country == country:
+                value += weights["country"]
+            if language in row.languages:
+                value += weights["language"]
+            if specialty in row.specialties:
+                value += weights["specialty"]
+            return value
+
+        with self._lock:
+            country = self._city_countries.get(city)
+            if min(weights.values()) < 0:
+                #the bucket bounds below assume every part adds to the score
+                best = heapq.nlargest(k, ((score(row), -pk) for pk, row in self._rows.items()))
+                return [(-negative_pk, value) for value, negative_pk in best]
+
+            #every translator sits in the bucket of exactly the criteria it matches: the request city,
+            #another city of its country or any city, with or without the language and specialty
+            city_keys = [(city, weights["city"])] if city in self._cities else []
+            if country is not None:
+                city_keys += [(name, weights["country"]) for name in self._country_cities[country] if name != city]
+            city_keys.append((None, 0))
+            language_keys = [(language, weights["language"]), (None, 0)] if language in self._languages else [(None, 0)]
+            specialty_keys = [(specialty, weights["specialty"]), (None, 0)] if specialty in self._specialties else [(None, 0)]
+            buckets = sorted(
+                ((city_bonus + language_bonus + specialty_bonus, (city_key, language_key, specialty_key))
+                 for city_key, city_bonus in city_keys
+                 for language_key, language_bonus in language_keys
+                 for specialty_key, specialty_bonus in specialty_keys),
+                key=lambda bucket: -bucket[0],
+            )
+
+            best, seen = [], set()
+            for bonus, key in buckets:
+                #rows are sorted by rating, so a row's bound is also the bound of everything after it
+                for negative_rating, pk in self._buckets.get(key, ()):
+                    bound = bonus - negative_rating * rating_weight + MAX_REVIEW_AVERAGE * reviews_weight
+                    #(a hair of slack for float rounding, ties are decided by id)
+                    if len(best) == k and bound < best[0][0] - 1e-9:
+                        break
+                    if pk in seen:
+                        continue
+                    seen.add(pk)
+                    entry = (score(self._rows[pk]), -pk)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+
+        best.sort(reverse=True)
+        return [(-negative_pk, value) for value, negative_pk in best]
+
+
+matching_index = MatchingIndex()
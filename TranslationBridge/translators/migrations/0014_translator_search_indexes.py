@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translators', '0013_translator_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='translator',
+            index=models.Index(fields=['-rating', '-id'], name='translator_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translator',
+            index=models.Index(fields=['-created_at', '-id'], name='translator_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translator',
+            index=models.Index(fields=['city', '-rating', '-id'], name='translator_city_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translator',
+            index=models.Index(fields=['city', '-created_at', '-id'], name='translator_city_recent_idx'),
+        ),
+    ]
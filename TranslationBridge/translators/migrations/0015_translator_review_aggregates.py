@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:32
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q, Sum
+
+
+#fill the new aggregate columns from the existing reviews
+def backfill_review_aggregates(apps, schema_editor):
+    Translator = apps.get_model("translators", "Translator")
+    Review = apps.get_model("translators", "Review")
+
+    stats = Review.objects.values("translator_id").annotate(
+        count=Count("id"),
+        total=Sum("rating"),
+        average=Avg("rating"),
+        star1=Count("id", filter=Q(rating__lte=1)),
+        star2=Count("id", filter=Q(rating=2)),
+        star3=Count("id", filter=Q(rating=3)),
+        star4=Count("id", filter=Q(rating=4)),
+        star5=Count("id", filter=Q(rating__gte=5)),
+    )
+    for row in stats:
+        Translator.objects.filter(pk=row["translator_id"]).update(
+            review_count=row["count"],
+            review_sum=row["total"] or 0,
+            review_average=row["average"] or 0,
+            review_star1=row["star1"],
+            review_star2=row["star2"],
+            review_star3=row["star3"],
+            review_star4=row["star4"],
+            review_star5=row["star5"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translators', '0014_translator_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translator',
+            name='review_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_star1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_star2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_star3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_star4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_star5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translator',
+            name='review_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
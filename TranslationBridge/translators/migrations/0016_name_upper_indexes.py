@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:22
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translators', '0015_translator_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='city_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='language',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='language_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialty',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='specialty_name_upper_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 
 # Create your models here.
@@ -17,6 +18,10 @@ class City(models.Model):
     #one to many relationship
     country = models.ForeignKey( Country, on_delete= models.CASCADE)
 
+    #name__iexact compares UPPER(name) on PostgreSQL
+    class Meta:
+        indexes = [models.Index(Upper("name"), name="city_name_upper_idx")]
+
     def __str__(self):
         return self.name
 
@@ -24,12 +29,19 @@ class City(models.Model):
 class Language(models.Model):
     name = models.CharField(max_length=50, unique= True )
 
+    class Meta:
+        indexes = [models.Index(Upper("name"), name="language_name_upper_idx")]
+
     def __str__(self):
         return self.name
  
 #Specialty model   
 class specialty(models.Model):
     name = models.CharField(max_length=50, unique= True )
+
+    class Meta:
+        indexes = [models.Index(Upper("name"), name="specialty_name_upper_idx")]
+
     def __str__(self):
         return self.name
 
@@ -60,9 +72,38 @@ class Translator(models.Model):
     #add specialties
     specialties = models.ManyToManyField(specialty)
 
+    #review aggregates, kept up to date by translators/aggregates.py
+    review_count = models.PositiveIntegerField(default=0)
+    review_sum = models.PositiveIntegerField(default=0)
+    review_average = models.FloatField(default=0)
+    review_star1 = models.PositiveIntegerField(default=0)
+    review_star2 = models.PositiveIntegerField(default=0)
+    review_star3 = models.PositiveIntegerField(default=0)
+    review_star4 = models.PositiveIntegerField(default=0)
+    review_star5 = models.PositiveIntegerField(default=0)
+
+    #indexes behind the list page filters and sort orders
+    class Meta:
+        indexes = [
+            models.Index(fields=["-rating", "-id"], name="translator_rating_idx"),
+            models.Index(fields=["-created_at", "-id"], name="translator_recent_idx"),
+            models.Index(fields=["city", "-rating", "-id"], name="translator_city_rating_idx"),
+            models.Index(fields=["city", "-created_at", "-id"], name="translator_city_recent_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+    #[(stars, count, percent), ...] from 5 stars down to 1, for the detail page
+    @property
+    def review_histogram(self):
+        histogram = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f"review_star{stars}")
+            percent = round(count * 100 / self.review_count) if self.review_count else 0
+            histogram.append((stars, count, percent))
+        return histogram
+
 
 #Users review 
 class Review(models.Model):
@@ -0,0 +1,66 @@
+"""
+Process-wide cache of the lookup tables (Language, City, Country, specialty).
+
+These tables almost never change but nearly every form and list page
+renders them, so they are loaded once per process into a ReferenceData
+snapshot and reused. The snapshot is tagged with the "reference" group
+version from main.cache; saving or deleting any of the tables bumps that
+version (see translators/apps.py) in the shared version store, and every worker
+process reloads within VERSION_CHECK_SECONDS.
+"""
+import threading
+
+from main.cache import group_versions
+
+from .matching import fold
+from .models import Country, City, Language, specialty
+
+
+GROUP = "reference"
+
+
+class ReferenceData:
+
+    def __init__(self, version):
+        self.version = version
+        self.countries = list(Country.objects.order_by("name"))
+        self.cities = list(City.objects.select_related("country").order_by("name"))
+        self.languages = list(Language.objects.order_by("name"))
+        self.specialties = list(specialty.objects.order_by("name"))
+
+        #case-folded name -> id, replaces name__iexact lookups
+        self.country_ids = {fold(country.name): country.id for country in self.countries}
+        self.city_ids = {fold(city.name): city.id for city in self.cities}
+        self.language_ids = {fold(language.name): language.id for language in self.languages}
+        self.specialty_ids = {fold(item.name): item.id for item in self.specialties}
+
+        #id -> instance
+        self.cities_by_id = {city.id: city for city in self.cities}
+        self.languages_by_id = {language.id: language for language in self.languages}
+        self.specialties_by_id = {item.id: item for item in self.specialties}
+
+    def city(self, name):
+        return self.cities_by_id.get(self.city_ids.get(fold(name)))
+
+    def language(self, name):
+        return self.languages_by_id.get(self.language_ids.get(fold(name)))
+
+    def specialty(self, name):
+        return self.specialties_by_id.get(self.specialty_ids.get(fold(name)))
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def reference_data():
+    """Return the current snapshot, reloading it if the tables changed."""
+    global _snapshot
+    version = group_versions([GROUP])[0]
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = ReferenceData(version)
+        return _snapshot
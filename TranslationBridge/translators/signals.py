@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Country, City, Language, Translator, Review, specialty
+from .matching import matching_index
+from .aggregates import apply_review, recompute_review_stats
+
+
+#keep the matching index in sync with translator rows
+@receiver(post_save, sender=Translator)
+def translator_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: matching_index.refresh_translator(instance.pk))
+
+
+@receiver(post_delete, sender=Translator)
+def translator_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: matching_index.remove_translator(pk))
+
+
+@receiver(m2m_changed, sender=Translator.languages.through)
+@receiver(m2m_changed, sender=Translator.specialties.through)
+def translator_sets_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        transaction.on_commit(lambda: matching_index.refresh_translator(instance.pk))
+    elif pk_set:
+        pks = set(pk_set)
+        transaction.on_commit(lambda: [matching_index.refresh_translator(pk) for pk in pks])
+    else:
+        #reverse clear (language.translator_set.clear()) doesn't tell us which rows changed
+        transaction.on_commit(matching_index.invalidate)
+
+
+#denormalized review aggregates on Translator, updated in the same transaction as the review
+@receiver(pre_save, sender=Review)
+def review_before_save(sender, instance, **kwargs):
+    instance._previous_review = None
+    if instance.pk:
+        instance._previous_review = Review.objects.filter(pk=instance.pk).values_list("translator_id", "rating").first()
+
+
+@receiver(post_save, sender=Review)
+def review_aggregates_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_review", None)
+    if created or previous is None:
+        apply_review(instance.translator_id, instance.rating)
+        return
+
+    if previous != (instance.translator_id, int(instance.rating)):
+        recompute_review_stats(instance.translator_id)
+        if previous[0] != instance.translator_id:
+            recompute_review_stats(previous[0])
+
+
+@receiver(post_delete, sender=Review)
+def review_aggregates_deleted(sender, instance, **kwargs):
+    apply_review(instance.translator_id, instance.rating, sign=-1)
+
+
+#review averages are part of the ranking features
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    translator_id = instance.translator_id
+    transaction.on_commit(lambda: matching_index.refresh_translator(translator_id))
+
+
+#lookup tables are matched by name, so any change there rebuilds the index
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+@receiver(post_save, sender=specialty)
+@receiver(post_delete, sender=specialty)
+def lookup_table_changed(sender, **kwargs):
+    transaction.on_commit(matching_index.invalidate)
@@ -1,3 +1,421 @@
-from django.test import TestCase
+import random
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Profile
+from main.images import forget_derivatives, generate
+from main.cache import forget_group_versions, group_versions, version_cache
+
+from .matching import DEFAULT_WEIGHTS, MatchingIndex, fold, matching_index
+from .models import Country, City, Language, Translator, Review, specialty
+from .reference import reference_data
 
 # Create your tests here.
+
+
+#cached counts, page responses, lookup tables and image derivatives must not leak between tests
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    forget_group_versions()
+    forget_derivatives()
+
+
+#group versions are read from the shared store once, then trusted for VERSION_CHECK_SECONDS
+@override_settings(VERSION_CHECK_SECONDS=60)
+class TranslatorListQueriesTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        country = Country.objects.create(name="Saudi Arabia", flag="images/Saudi-Flag.jpg")
+        self.city = City.objects.create(name="Riyadh", country=country)
+        self.specialties = [specialty.objects.create(name="Legal"), specialty.objects.create(name="Medical")]
+        reference_data()
+        group_versions(["translators"])
+
+    def create_translators(self, count):
+        for number in range(count):
+            translator = Translator.objects.create(name=f"Translator {number}", experience="10 years", city=self.city)
+            translator.specialties.set(self.specialties)
+        #this process remembers the derivatives it made, rendering the cards reads no cache table
+        generate(translator.image.name)
+
+    #page + specialties prefetch + count, whatever the page size (filter lookups come from reference_data)
+    def test_single_translator_page(self):
+        self.create_translators(1)
+        with self.assertNumQueries(3):
+            self.client.get(reverse("translators:translator_list_view"))
+
+    def test_full_page(self):
+        self.create_translators(6)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("translators:translator_list_view"))
+
+        self.assertEqual(len(response.context["translators"]), 6)
+        self.assertContains(response, "<h5>Medical</h5>", count=6)
+
+
+class TranslatorListPaginationTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        for number in range(8):
+            Translator.objects.create(name=f"Translator {number}", experience="10 years", rating=number % 5 + 1)
+
+    def test_cursor_walks_forward_and_back(self):
+        url = reverse("translators:translator_list_view")
+
+        first = self.client.get(url).context["translators"]
+        self.assertEqual(len(first), 6)
+        self.assertFalse(first.has_previous)
+        self.assertEqual(first.approximate_count, 8)
+
+        second = self.client.get(f"{url}?{first.next_query}").context["translators"]
+        self.assertEqual(len(second), 2)
+        self.assertFalse(second.has_next)
+
+        seen = [t.pk for t in first] + [t.pk for t in second]
+        expected = list(Translator.objects.order_by("-rating", "-id").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+        back = self.client.get(f"{url}?{second.previous_query}").context["translators"]
+        self.assertEqual([t.pk for t in back], [t.pk for t in first])
+
+    def test_tampered_cursor_starts_from_first_page(self):
+        response = self.client.get(reverse("translators:translator_list_view"), {"cursor": "not-a-cursor"})
+        self.assertEqual(len(response.context["translators"]), 6)
+
+
+class TranslatorListSearchTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        country = Country.objects.create(name="Saudi Arabia", flag="images/Saudi-Flag.jpg")
+        self.riyadh = City.objects.create(name="Riyadh", country=country)
+        self.jeddah = City.objects.create(name="Jeddah", country=country)
+        self.arabic = Language.objects.create(name="Arabic")
+        self.legal = specialty.objects.create(name="Legal")
+
+        self.match = Translator.objects.create(name="Match", experience="-", rating=4, city=self.riyadh)
+        self.match.languages.add(self.arabic)
+        self.match.specialties.add(self.legal)
+
+        self.other_city = Translator.objects.create(name="Other city", experience="-", rating=5, city=self.jeddah)
+        self.other_city.languages.add(self.arabic)
+        self.other_city.specialties.add(self.legal)
+
+        self.low_rating = Translator.objects.create(name="Low rating", experience="-", rating=1, city=self.riyadh)
+        self.low_rating.languages.add(self.arabic)
+
+    def search(self, **params):
+        response = self.client.get(reverse("translators:translator_list_view"), params)
+        return [translator.name for translator in response.context["translators"]]
+
+    def test_combined_filters(self):
+        self.assertEqual(self.search(language=self.arabic.id, city=self.riyadh.id, specialty=self.legal.id), ["Match"])
+        self.assertEqual(self.search(city=self.riyadh.id, min_rating=2), ["Match"])
+
+    def test_sort_by_rating_and_recency(self):
+        self.assertEqual(self.search(language=self.arabic.id), ["Other city", "Match", "Low rating"])
+        self.assertEqual(self.search(language=self.arabic.id, sort="recent"), ["Low rating", "Other city", "Match"])
+
+    def test_invalid_filters_are_ignored(self):
+        self.assertEqual(len(self.search(city="riyadh", min_rating=9)), 3)
+
+
+class ReviewAggregatesTest(TestCase):
+
+    def setUp(self):
+        self.translator = Translator.objects.create(name="Translator", experience="-")
+        self.user = User.objects.create_user("reviewer", password="secret")
+
+    def assertAggregates(self, count, average, histogram):
+        self.translator.refresh_from_db()
+        self.assertEqual(self.translator.review_count, count)
+        self.assertAlmostEqual(self.translator.review_average, average)
+        self.assertEqual([self.translator.review_star1, self.translator.review_star2, self.translator.review_star3, self.translator.review_star4, self.translator.review_star5], histogram)
+
+    def test_insert_update_and_delete(self):
+        five = Review.objects.create(translator=self.translator, user=self.user, rating=5, comment="great")
+        two = Review.objects.create(translator=self.translator, user=self.user, rating=2, comment="meh")
+        self.assertAggregates(2, 3.5, [0, 1, 0, 0, 1])
+
+        two.rating = 4
+        two.save()
+        self.assertAggregates(2, 4.5, [0, 0, 0, 1, 1])
+
+        five.delete()
+        two.delete()
+        self.assertAggregates(0, 0, [0, 0, 0, 0, 0])
+
+    def test_review_view(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("translators:review_view", args=[self.translator.id]), {"rating": "3", "comment": "ok"})
+        self.assertAggregates(1, 3, [0, 0, 1, 0, 0])
+
+        #out of range or not a number: rejected before anything is saved
+        for rating in ("0", "6", "-1", "five"):
+            self.client.post(reverse("translators:review_view", args=[self.translator.id]), {"rating": rating, "comment": "bad"})
+        self.assertEqual(Review.objects.count(), 1)
+        self.assertAggregates(1, 3, [0, 0, 1, 0, 0])
+
+        #no rating at all still counts as 5 stars
+        self.client.post(reverse("translators:review_view", args=[self.translator.id]), {"comment": "great"})
+        self.assertAggregates(2, 4, [0, 0, 1, 0, 1])
+
+
+class TranslatorReviewsPageTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.translator = Translator.objects.create(name="Translator", experience="-")
+        for number in range(7):
+            user = User.objects.create_user(f"reviewer{number}", password="secret")
+            Profile.objects.create(user=user)
+            Review.objects.create(translator=self.translator, user=user, rating=5, comment=f"comment {number}")
+        generate(self.translator.image.name)
+        generate(user.profile.avatar.name)
+
+    def test_detail_embeds_first_page_in_constant_queries(self):
+        #translator + languages prefetch + one joined reviews query
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("translators:translator_detail_view", args=[self.translator.id]))
+        self.assertEqual(len(response.context["reviews"]), 5)
+        self.assertContains(response, "data-reviews-url")
+
+    def test_fragment_and_json_pages(self):
+        first = self.client.get(reverse("translators:translator_detail_view", args=[self.translator.id])).context["reviews"]
+        url = reverse("translators:review_page_view", args=[self.translator.id])
+
+        fragment = self.client.get(f"{url}?{first.next_query}")
+        self.assertEqual(len(fragment.context["reviews"]), 2)
+        self.assertNotContains(fragment, "data-reviews-url")
+
+        data = self.client.get(url, {"format": "json"}).json()
+        self.assertEqual(len(data["reviews"]), 5)
+        self.assertEqual(data["reviews"][0]["comment"], "comment 6")
+        self.assertIsNotNone(data["next"])
+
+
+class ReferenceDataTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+
+    def test_loaded_once_and_refreshed_on_change(self):
+        country = Country.objects.create(name="Saudi Arabia", flag="images/Saudi-Flag.jpg")
+        City.objects.create(name="Riyadh", country=country)
+        reference_data()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(reference_data().city("  RIYADH ").name, "Riyadh")
+            self.assertIsNone(reference_data().language("Arabic"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Language.objects.create(name="Arabic")
+        self.assertEqual(reference_data().language("arabic").name, "Arabic")
+
+    def test_change_made_by_another_worker_is_seen(self):
+        reference_data()
+        #another process adds a language and bumps the shared version; only the version store is shared
+        Language.objects.create(name="Urdu")
+        version_cache().incr("view-cache:group:reference")
+        self.assertIsNone(reference_data().language("urdu"))
+
+        #once VERSION_CHECK_SECONDS have passed this worker asks the shared store again
+        with override_settings(VERSION_CHECK_SECONDS=0):
+            self.assertEqual(reference_data().language("urdu").name, "Urdu")
+
+            #an expired or evicted version counts as a change too
+            Language.objects.create(name="Farsi")
+            version_cache().clear()
+            self.assertEqual(reference_data().language("farsi").name, "Farsi")
+
+
+class MatchingIndexWorkersTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        country = Country.objects.create(name="Saudi Arabia", flag="images/Saudi-Flag.jpg")
+        self.riyadh = City.objects.create(name="Riyadh", country=country)
+
+    def test_change_made_by_another_worker_is_seen(self):
+        #two indexes stand in for two gunicorn workers, only the version store is shared
+        this_worker, other_worker = MatchingIndex(), MatchingIndex()
+        first = Translator.objects.create(name="First", experience="-", city=self.riyadh)
+        self.assertEqual(this_worker.match(city="Riyadh"), [first.pk])
+        self.assertEqual(other_worker.match(city="Riyadh"), [first.pk])
+
+        second = Translator.objects.create(name="Second", experience="-", city=self.riyadh, rating=5)
+        other_worker.refresh_translator(second.pk)
+        self.assertEqual(other_worker.match(city="Riyadh"), [second.pk, first.pk])
+
+        with override_settings(VERSION_CHECK_SECONDS=0):
+            self.assertEqual(this_worker.match(city="Riyadh"), [second.pk, first.pk])
+
+            #a version lost from the shared store counts as stale too
+            third = Translator.objects.create(name="Third", experience="-", city=self.riyadh, rating=3)
+            version_cache().clear()
+            self.assertEqual(this_worker.match(city="Riyadh"), [second.pk, third.pk, first.pk])
+
+    def test_load_sorts_rows_and_unloaded_indexes_publish(self):
+        ratings = [2, 5, 1, 5, 3, 4, 2]
+        pks = [Translator.objects.create(name=f"T{i}", experience="-", city=self.riyadh, rating=rating).pk for i, rating in enumerate(ratings)]
+        index = MatchingIndex()
+        expected = [pk for _, pk in sorted(zip((-rating for rating in ratings), pks))]
+        self.assertEqual(index.match(city="Riyadh"), expected)
+        self.assertEqual(index.match(), expected)
+
+        #loaded without a known version (the version store missed), a change reloads instead of failing
+        unversioned = MatchingIndex()
+        unversioned._load(None)
+        unversioned.refresh_translator(pks[0])
+        self.assertFalse(unversioned._loaded)
+        self.assertEqual(unversioned.match(city="Riyadh", limit=2), expected[:2])
+
+
+class MatchingIndexTest(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        matching_index.invalidate()
+        saudi = Country.objects.create(name="Saudi Arabia", flag="images/Saudi-Flag.jpg")
+        self.riyadh = City.objects.create(name="Riyadh", country=saudi)
+        self.jeddah = City.objects.create(name="Jeddah", country=saudi)
+        self.cairo = City.objects.create(name="Cairo", country=Country.objects.create(name="Egypt", flag="images/egypt.png"))
+        self.arabic = Language.objects.create(name="Arabic")
+        self.english = Language.objects.create(name="English")
+        self.legal = specialty.objects.create(name="Legal")
+
+    def translator(self, name, city, rating=1, languages=(), specialties=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            translator = Translator.objects.create(name=name, experience="-", city=city, rating=rating)
+            translator.languages.set(languages)
+            translator.specialties.set(specialties)
+        return translator
+
+    def test_index_follows_translator_changes(self):
+        low = self.translator("Low", self.riyadh, rating=2, languages=[self.arabic])
+        high = self.translator("High", self.riyadh, rating=5, languages=[self.arabic])
+        self.assertEqual(matching_index.match(city="riyadh", language="ARABIC"), [high.pk, low.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            low.rating = 5
+            low.city = self.cairo
+            low.save()
+        self.assertEqual(matching_index.match(city="Riyadh"), [high.pk])
+        self.assertEqual(matching_index.match(city="Cairo", language="Arabic"), [low.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            high.delete()
+        self.assertEqual(matching_index.match(city="Riyadh"), [])
+        #unknown names are ignored like the old view did
+        self.assertEqual(matching_index.match(city="Atlantis", language="Arabic"), [low.pk])
+
+    def test_index_follows_language_and_specialty_sets(self):
+        translator = self.translator("Translator", self.riyadh)
+        other = self.translator("Other", self.jeddah)
+        matching_index.match()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            translator.languages.add(self.english)
+            translator.specialties.add(self.legal)
+        self.assertEqual(matching_index.match(language="English", specialty="Legal"), [translator.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            translator.specialties.remove(self.legal)
+        self.assertEqual(matching_index.match(specialty="Legal"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            translator.languages.clear()
+        self.assertEqual(matching_index.match(language="English"), [])
+
+        #from the language's side: add and remove name the rows, clear doesn't
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arabic.translator_set.add(translator, other)
+        self.assertEqual(sorted(matching_index.match(language="Arabic")), sorted([translator.pk, other.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arabic.translator_set.remove(other)
+        self.assertEqual(matching_index.match(language="Arabic"), [translator.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arabic.translator_set.clear()
+        self.assertEqual(matching_index.match(language="Arabic"), [])
+
+    def test_lookup_table_changes_rebuild_the_index(self):
+        translator = self.translator("Translator", self.riyadh, languages=[self.arabic])
+        self.assertEqual(matching_index.match(city="Riyadh"), [translator.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.riyadh.name = "Ar Riyadh"
+            self.riyadh.save()
+        self.assertEqual(matching_index.match(city="Ar Riyadh"), [translator.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arabic.name = "Arabic (MSA)"
+            self.arabic.save()
+        self.assertEqual(matching_index.match(language="arabic (msa)"), [translator.pk])
+
+    def test_rank_scores_partial_matches_with_weights(self):
+        exact = self.translator("Exact", self.riyadh, rating=1, languages=[self.arabic], specialties=[self.legal])
+        same_country = self.translator("Same country", self.jeddah, rating=1, languages=[self.arabic], specialties=[self.legal])
+        elsewhere = self.translator("Elsewhere", self.cairo, rating=5, languages=[self.arabic])
+        unrelated = self.translator("Unrelated", self.cairo, rating=1)
+
+        ranked = matching_index.rank(city="Riyadh", language="Arabic", specialty="Legal", k=10)
+        self.assertEqual([pk for pk, _ in ranked], [exact.pk, same_country.pk, elsewhere.pk, unrelated.pk])
+        scores = dict(ranked)
+        #city 3 + language 4 + specialty 2 + rating 1/5, the Jeddah translator gets country 1.5 instead of city
+        self.assertAlmostEqual(scores[exact.pk], 9.2)
+        self.assertAlmostEqual(scores[same_country.pk], 7.7)
+        self.assertAlmostEqual(scores[elsewhere.pk], 5.0)
+
+        #top K
+        self.assertEqual([pk for pk, _ in matching_index.rank(city="Riyadh", language="Arabic", specialty="Legal", k=2)], [exact.pk, same_country.pk])
+
+        #weights can be overridden per call and from settings
+        ranked = matching_index.rank(city="Riyadh", language="Arabic", k=2, weights={"rating": 20})
+        self.assertEqual(ranked[0][0], elsewhere.pk)
+        with override_settings(TRANSLATOR_MATCH_WEIGHTS={"country": 0}, TRANSLATOR_MATCH_TOP_K=3):
+            ranked = matching_index.rank(city="Riyadh", language="Arabic", specialty="Legal")
+        self.assertEqual(len(ranked), 3)
+        self.assertAlmostEqual(dict(ranked)[same_country.pk], 6.2)
+
+    def test_rank_reads_only_the_buckets_it_needs_and_matches_a_full_scan(self):
+        rng = random.Random(7)
+        cities = [self.riyadh, self.jeddah, self.cairo, None]
+        languages = [self.arabic, self.english]
+        for i in range(60):
+            self.translator(
+                f"T{i}", rng.choice(cities), rating=rng.randint(1, 5),
+                languages=rng.sample(languages, rng.randint(0, 2)), specialties=[self.legal] if rng.random() < 0.3 else [],
+            )
+        Translator.objects.filter(pk__in=rng.sample(list(Translator.objects.values_list("pk", flat=True)), 20)).update(review_average=4.5)
+        matching_index.invalidate()
+        matching_index.match()
+
+        def full_scan(city, language, specialty, k, weights):
+            weights = {**DEFAULT_WEIGHTS, **weights}
+            country = matching_index._city_countries.get(fold(city))
+            scores = []
+            for pk, row in matching_index._rows.items():
+                score = row.rating * weights["rating"] / 5 + row.review_average * weights["reviews"] / 5
+                if city is not None and row.city == fold(city):
+                    score += weights["city"]
+                elif country is not None and row.country == country:
+                    score += weights["country"]
+                score += weights["language"] * (fold(language) in row.languages) + weights["specialty"] * (fold(specialty) in row.specialties)
+                scores.append((score, -pk))
+            return [(-pk, score) for score, pk in sorted(scores, reverse=True)[:k]]
+
+        for city in ("Riyadh", "Cairo", None, "Atlantis"):
+            for language in ("Arabic", "English", None):
+                for specialty_name in ("Legal", None):
+                    for k, weights in ((5, {}), (20, {"rating": 10}), (3, {"city": 0, "reviews": 8})):
+                        ranked = matching_index.rank(city=city, language=language, specialty=specialty_name, k=k, weights=weights)
+                        expected = full_scan(city, language, specialty_name, k, weights)
+                        self.assertEqual([pk for pk, _ in ranked], [pk for pk, _ in expected])
+                        for (_, score), (_, expected_score) in zip(ranked, expected):
+                            self.assertAlmostEqual(score, expected_score)
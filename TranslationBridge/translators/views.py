@@ -1,14 +1,20 @@
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse, QueryDict
 
 #import models
-from .models import Country, City, Translator, Review, Language, specialty
+from .models import Country, Translator, Review
+
+#cached lookup tables
+from .reference import reference_data
 
 #import form
-from .forms import TranslatorForm
+from .forms import ReviewForm, TranslatorForm, TranslatorSearchForm
 
 #for pagination
-from django.core.paginator import Paginator
+from main.pagination import KeysetPaginator
+
+#for caching public pages
+from main.cache import cache_view
 
 #for messages notifications
 from django.contrib import messages
@@ -20,6 +26,7 @@ from django.template.loader import render_to_string
 
 #for aggregation
 from django.db.models import Count, Avg, Sum, Max, Min, Q, F
+from django.db import transaction
 
 
 
@@ -32,9 +39,7 @@ def create_translator_view(request:HttpRequest):
     #Form calling
     translator_form = TranslatorForm()
 
-    city = City.objects.all()
-    languages = Language.objects.all()
-    specialties = specialty.objects.all()
+    reference = reference_data()
 
     if request.method == "POST":
         translator_form = TranslatorForm(request.POST)
@@ -45,31 +50,83 @@ def create_translator_view(request:HttpRequest):
         else:
             print("not valid form", translator_form.errors)
              
-    return render(request, "translators/translators_create.html", {"translator_form":translator_form , "RatingChoices":Translator.RatingChoices.choices, "cities":city, "languages":languages, "specialties":specialties } )
+    return render(request, "translators/translators_create.html", {"translator_form":translator_form , "RatingChoices":Translator.RatingChoices.choices, "cities":reference.cities, "languages":reference.languages, "specialties":reference.specialties } )
 
 
 #All translator list
+@cache_view("translators")
 def translator_list_view(request:HttpRequest):
 
-    translators = Translator.objects.all()
-    languages = Language.objects.all()
-    cities = City.objects.all()
+    #one query for the page (with city joined) and one for all the specialties on it
+    translators = Translator.objects.select_related("city").prefetch_related("specialties")
+    reference = reference_data()
+
+    #search filters, every combination is backed by an index (see Translator.Meta)
+    search_form = TranslatorSearchForm(request.GET)
+    filters = search_form.cleaned_data if search_form.is_valid() else {}
+
+    if filters.get("language"):
+        translators = translators.filter(languages=filters["language"])
+    if filters.get("city"):
+        translators = translators.filter(city=filters["city"])
+    if filters.get("specialty"):
+        translators = translators.filter(specialties=filters["specialty"])
+    if filters.get("min_rating"):
+        translators = translators.filter(rating__gte=filters["min_rating"])
 
-    page_number = request.GET.get("page",1)
-    paginator = Paginator(translators, 6)
-    translators_page =paginator.get_page(page_number)
+    ordering = ("-created_at", "-id") if filters.get("sort") == "recent" else ("-rating", "-id")
 
-    context = { "translators": translators_page, "languages": languages, "cities":cities }
+    #cursor pagination, deep pages cost the same as the first one
+    paginator = KeysetPaginator(translators, ordering=ordering, per_page=6, with_count=True)
+    translators_page = paginator.get_page(request.GET)
+
+    context = { "translators": translators_page, "languages": reference.languages, "cities":reference.cities, "specialties":reference.specialties, "filters":filters, "RatingChoices":Translator.RatingChoices.choices }
 
     return render(request, "translators/translators_list.html", context)
 
 
+#reviews are paged newest first, the detail page embeds the first page only
+REVIEWS_PER_PAGE = 5
+
+
+def reviews_page(translator_id, query_params):
+    reviews = Review.objects.filter(translator_id=translator_id).select_related("user__profile")
+    paginator = KeysetPaginator(reviews, ordering=("-created_at", "-id"), per_page=REVIEWS_PER_PAGE)
+    return paginator.get_page(query_params)
+
+
 #Translator detail
 def translator_detail_view(request:HttpRequest, translators_id:int):
 
-    translator = Translator.objects.get(pk=translators_id)
+    translator = Translator.objects.select_related("city__country").prefetch_related("languages").get(pk=translators_id)
+    reviews = reviews_page(translator.id, QueryDict())
+
+    return render(request, 'translators/translators_detail.html',{ "translator" : translator, "reviews": reviews })
+
+
+#Next pages of reviews for the detail page, as an HTML fragment or JSON (?format=json)
+def review_page_view(request:HttpRequest, translator_id:int):
 
-    return render(request, 'translators/translators_detail.html',{ "translator" : translator })
+    reviews = reviews_page(translator_id, request.GET)
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "reviews": [
+                {
+                    "id": review.id,
+                    "username": review.user.username,
+                    "last_name": review.user.last_name,
+                    "avatar": review.user.profile.avatar.url if hasattr(review.user, "profile") else None,
+                    "rating": review.rating,
+                    "comment": review.comment,
+                    "created_at": review.created_at.isoformat(),
+                }
+                for review in reviews
+            ],
+            "next": reviews.next_cursor if reviews.has_next else None,
+        })
+
+    return render(request, "translators/translators_reviews_include.html", {"reviews": reviews, "translator_id": translator_id})
 
 def review_view(request:HttpRequest, translator_id:int):
 
@@ -79,14 +136,17 @@ def review_view(request:HttpRequest, translator_id:int):
 
     if request.method == "POST":
         translator_object = Translator.objects.get(pk=translator_id)
-        new_review = Review(
-            translator=translator_object,
-            user=request.user,
-            rating=request.POST.get("rating", 5),
-            comment=request.POST.get("comment", "")
-        )
-        new_review.save()
-        messages.success(request, "Review added successfully!", "alert-success")
+        review_form = ReviewForm(data=request.POST)
+        if review_form.is_valid():
+            new_review = review_form.save(commit=False)
+            new_review.translator = translator_object
+            new_review.user = request.user
+            #the review and the translator's review aggregates are saved together
+            with transaction.atomic():
+                new_review.save()
+            messages.success(request, "Review added successfully!", "alert-success")
+        else:
+            messages.error(request, "Please choose a rating between 1 and 5", "alert-danger")
 
 
     return redirect("translators:translator_detail_view", translators_id=translator_id)
@@ -94,10 +154,8 @@ def review_view(request:HttpRequest, translator_id:int):
 #Translator update information
 def translator_update_view(request:HttpRequest, translators_id):
 
-    translator = Translator.objects.get( pk=translators_id)
-    languages = Language.objects.all()
-    specialties = specialty.objects.all()
-    all_cities = City.objects.all()
+    translator = Translator.objects.prefetch_related("languages").get( pk=translators_id)
+    reference = reference_data()
 
     if request.method == "POST":
         #using TranslatorForm for update
@@ -110,7 +168,7 @@ def translator_update_view(request:HttpRequest, translators_id):
         
         return redirect("translators:translator_detail_view", translators_id=translator.id)
     
-    return render(request, "translators/translators_update.html", {"translator": translator, "cities": all_cities, "languages":languages, "specialties":specialties})
+    return render(request, "translators/translators_update.html", {"translator": translator, "cities": reference.cities, "languages":reference.languages, "specialties":reference.specialties})
            
 
 #Translator delete information